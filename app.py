@@ -14,10 +14,22 @@ def create_app():
     from routes.upload_route import upload_bp
     from routes.process_route import process_bp
     from routes.download_route import download_bp
+    from routes.batch_route import batch_bp
+    from routes.metrics_route import metrics_bp
+    from routes.api_route import api_bp
+    from routes.admin_route import admin_bp
+    from services.storage_manager import storage_manager
     
     app.register_blueprint(upload_bp)
     app.register_blueprint(process_bp)
     app.register_blueprint(download_bp)
+    app.register_blueprint(batch_bp)
+    app.register_blueprint(metrics_bp)
+    app.register_blueprint(api_bp)
+    app.register_blueprint(admin_bp)
+    
+    # The sweeper starts on the first request, after server workers have forked
+    app.before_request(storage_manager.start)
     
     # Main route
     @app.route('/')
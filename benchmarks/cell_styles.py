@@ -0,0 +1,66 @@
+"""Per-cell formatting cost: fresh style objects per cell vs palette style ids
+
+Run from the repository root: python benchmarks/cell_styles.py [rows]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from openpyxl import Workbook
+from openpyxl.styles import Font, Border, Side
+from services.report_formatter import ReportFormatter, NUM_COLUMNS, outline_border, style_id
+
+GROUP_ROWS = 4
+
+def format_with_objects(ws, formatter, rows):
+    """Previous approach: thin pass, then a new Border/Font for every cell"""
+    thick_side = Side(style='thick')
+    for start_row in range(1, rows + 1, GROUP_ROWS):
+        end_row = start_row + GROUP_ROWS - 1
+        for row in range(start_row, end_row + 1):
+            for column in range(1, NUM_COLUMNS + 1):
+                cell = ws.cell(row=row, column=column)
+                cell.font = formatter.normal_font
+                cell.alignment = formatter.center_align
+                cell.border = formatter.thin_border
+                cell.fill = formatter.white_fill
+        for row in range(start_row, end_row + 1):
+            for column in range(1, NUM_COLUMNS + 1):
+                cell = ws.cell(row=row, column=column)
+                cell.border = Border(
+                    left=thick_side if column == 1 else cell.border.left,
+                    right=thick_side if column == NUM_COLUMNS else cell.border.right,
+                    top=thick_side if row == start_row else cell.border.top,
+                    bottom=thick_side if row == end_row else cell.border.bottom
+                )
+        for column in (1, 2, 16, 17):
+            ws.cell(row=start_row, column=column).font = Font(name='Arial', size=14, bold=True)
+
+def format_with_palette(ws, formatter, rows):
+    """Palette approach: one style id per cell"""
+    for start_row in range(1, rows + 1, GROUP_ROWS):
+        end_row = start_row + GROUP_ROWS - 1
+        for row in range(start_row, end_row + 1):
+            for column in range(1, NUM_COLUMNS + 1):
+                font = 'station_trains' if row == start_row and column in (1, 2, 16, 17) else 'normal'
+                border = outline_border(row, column, start_row, end_row)
+                formatter.apply_style(ws.cell(row=row, column=column), style_id(font, 'center', border))
+
+def run(rows):
+    results = {}
+    for name, format_cells in (('objects', format_with_objects), ('palette', format_with_palette)):
+        ws = Workbook().active
+        formatter = ReportFormatter()
+        start = time.perf_counter()
+        format_cells(ws, formatter, rows)
+        elapsed = time.perf_counter() - start
+        results[name] = elapsed
+        cells = rows * NUM_COLUMNS
+        print(f"{name:8s} {cells} cells  {elapsed * 1000:8.1f} ms  {elapsed / cells * 1e6:6.2f} us/cell")
+
+    print(f"speedup  {results['objects'] / results['palette']:.1f}x")
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
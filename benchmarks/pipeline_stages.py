@@ -0,0 +1,232 @@
+"""Wall time and peak RSS of each report pipeline stage on synthetic exports
+
+Every size runs in a fresh process inside a scratch working directory (its
+own uploads/, intermediate/, reports/ and a copy of data/), so one size's
+memory does not leak into the next. Results are written as JSON tagged with
+the current commit; pass --compare with an earlier file to see regressions.
+
+Run from the repository root:
+    python benchmarks/pipeline_stages.py [--sizes 1000 10000 100000 1000000] [--compare old.json]
+"""
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from benchmarks.synthetic_export import write_export
+
+DEFAULT_SIZES = [1000, 10000, 100000, 1000000]
+
+# openpyxl needs minutes for a million row intermediate workbook
+DEFAULT_INTERMEDIATE_MAX_ROWS = 100000
+
+def _rss_bytes():
+    """Current resident set size, None where /proc is unavailable"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return None
+
+def _max_rss_bytes():
+    """Peak RSS of this process so far (ru_maxrss is KiB on Linux, bytes on macOS)"""
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max_rss if sys.platform == 'darwin' else max_rss * 1024
+
+class StageTimer:
+    """Time stages and sample RSS in the background to find each stage's peak"""
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.stages = []
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        peak = [_rss_bytes() or 0]
+        done = threading.Event()
+
+        def sample():
+            while not done.wait(self.interval):
+                peak[0] = max(peak[0], _rss_bytes() or 0)
+
+        sampler = threading.Thread(target=sample, daemon=True)
+        rss_before = peak[0]
+        sampler.start()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            done.set()
+            sampler.join()
+            peak[0] = max(peak[0], _rss_bytes() or 0)
+            self.stages.append({
+                'stage': name,
+                'seconds': round(seconds, 4),
+                'rss_before_mb': round(rss_before / 2 ** 20, 1),
+                # Without /proc fall back to the process-wide high-water mark
+                'peak_rss_mb': round((peak[0] or _max_rss_bytes()) / 2 ** 20, 1),
+            })
+
+    def skip(self, name, reason):
+        self.stages.append({'stage': name, 'skipped': reason})
+
+def run_stages(workdir, filename, intermediate_max_rows, rows, renderer):
+    """Worker body: run every stage once on an upload in workdir"""
+    # Config resolves its folders against the working directory on import
+    os.chdir(workdir)
+    if renderer:
+        os.environ['REPORT_RENDERER'] = renderer
+
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        from services.csv_processor import CSVProcessor
+        from services.xlsx_generator import XLSXGenerator
+        from services.final_report_generator import FinalReportGenerator
+
+        csv_processor = CSVProcessor()
+        xlsx_generator = XLSXGenerator()
+        final_report_generator = FinalReportGenerator()
+        report_processor = final_report_generator.data_processor
+        timer = StageTimer()
+
+        with timer.stage('process_csv'):
+            processed_df = csv_processor.process_csv(filename)
+
+        if rows <= intermediate_max_rows:
+            with timer.stage('generate_intermediate_xlsx'):
+                xlsx_generator.generate_intermediate_xlsx(processed_df, filename)
+        else:
+            timer.skip('generate_intermediate_xlsx', f"rows > {intermediate_max_rows}")
+
+        # What ReportPipeline hands to the aggregation stages
+        with timer.stage('build_intermediate_frame'):
+            report_df = xlsx_generator.build_intermediate_frame(processed_df).replace('', float('nan'))
+
+        with timer.stage('process_handedover_data'):
+            handedover_data = report_processor.process_handedover_data(report_df)
+
+        with timer.stage('process_takenover_data'):
+            takenover_data = report_processor.process_takenover_data(report_df)
+
+        with timer.stage('generate_final_report'):
+            final_report_generator.generate_final_report(handedover_data, takenover_data, filename)
+
+    return {'stages': timer.stages, 'peak_rss_mb': round(_max_rss_bytes() / 2 ** 20, 1)}
+
+def prepare_workdir(workdir):
+    """Scratch folders plus the repository's reference data"""
+    for folder in ('uploads', 'intermediate', 'reports'):
+        os.makedirs(os.path.join(workdir, folder), exist_ok=True)
+    shutil.copytree(os.path.join(REPO_ROOT, 'data'), os.path.join(workdir, 'data'), dirs_exist_ok=True)
+
+def git_revision():
+    """(commit, dirty) of the repository, (None, None) outside git"""
+    try:
+        commit = subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT, text=True, stderr=subprocess.DEVNULL
+        ).strip()
+        status = subprocess.check_output(
+            ['git', 'status', '--porcelain', '--untracked-files=no'], cwd=REPO_ROOT, text=True,
+            stderr=subprocess.DEVNULL
+        )
+        return commit, bool(status.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+
+def run(sizes, workdir, seed=0, intermediate_max_rows=DEFAULT_INTERMEDIATE_MAX_ROWS, renderer=None):
+    prepare_workdir(workdir)
+    commit, dirty = git_revision()
+
+    import pandas as pd
+    results = {
+        'commit': commit,
+        'dirty': dirty,
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'platform': platform.platform(),
+        'renderer': renderer or os.environ.get('REPORT_RENDERER', 'openpyxl'),
+        'csv_engine': os.environ.get('CSV_ENGINE', 'auto'),
+        'seed': seed,
+        'sizes': [],
+    }
+
+    context = multiprocessing.get_context('spawn')
+    for rows in sizes:
+        filename = f"synthetic_{rows}_{seed}.csv"
+        file_path = os.path.join(workdir, 'uploads', filename)
+        if not os.path.exists(file_path):
+            print(f"Generating {rows} rows...")
+            write_export(file_path, rows, seed)
+
+        print(f"Running {rows} rows...")
+        with context.Pool(1) as pool:
+            measured = pool.apply(run_stages, (workdir, filename, intermediate_max_rows, rows, renderer))
+
+        results['sizes'].append(dict(rows=rows, file_bytes=os.path.getsize(file_path), **measured))
+        for stage in measured['stages']:
+            if 'skipped' in stage:
+                print(f"  {stage['stage']:<28} skipped ({stage['skipped']})")
+            else:
+                print(f"  {stage['stage']:<28} {stage['seconds']:>9.3f}s {stage['peak_rss_mb']:>9.1f} MB")
+
+    return results
+
+def compare(results, baseline):
+    """Print each stage's time and peak RSS relative to an earlier run"""
+    print(f"\nCompared with {baseline.get('commit')} ({baseline.get('timestamp')}):")
+    previous = {
+        (size['rows'], stage['stage']): stage
+        for size in baseline.get('sizes', []) for stage in size['stages'] if 'skipped' not in stage
+    }
+    for size in results['sizes']:
+        for stage in size['stages']:
+            old = previous.get((size['rows'], stage['stage']))
+            if old is None or 'skipped' in stage:
+                continue
+            time_ratio = stage['seconds'] / old['seconds'] if old['seconds'] else float('inf')
+            rss_ratio = stage['peak_rss_mb'] / old['peak_rss_mb'] if old['peak_rss_mb'] else float('inf')
+            print(f"  {size['rows']:>8} {stage['stage']:<28} time x{time_ratio:.2f}  peak RSS x{rss_ratio:.2f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workdir', default=os.path.join(tempfile.gettempdir(), 'conv-benchmarks'))
+    parser.add_argument('--intermediate-max-rows', type=int, default=DEFAULT_INTERMEDIATE_MAX_ROWS,
+                        help='skip generate_intermediate_xlsx above this many rows')
+    parser.add_argument('--renderer', choices=['openpyxl', 'xlsxwriter'])
+    parser.add_argument('--output', help='results JSON (default benchmarks/results/pipeline-<commit>.json)')
+    parser.add_argument('--compare', help='earlier results JSON to compare against')
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.workdir, args.seed, args.intermediate_max_rows, args.renderer)
+
+    output = args.output or os.path.join(
+        REPO_ROOT, 'benchmarks', 'results',
+        f"pipeline-{results['commit'] or 'unknown'}{'-dirty' if results['dirty'] else ''}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            compare(results, json.load(f))
+
+if __name__ == '__main__':
+    main()
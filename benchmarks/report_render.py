@@ -0,0 +1,141 @@
+"""Final report rendering: per-cell writes and restyling vs a planned layout written once
+
+Synthetic section data with thousands of stations, so the station groups and
+their DETAILS lists dominate. The previous approach is reproduced inline:
+values written by address, every cell of a group restyled, then merged. Each
+merge_cells() call compares the range with every earlier one, so it is only
+run up to --per-cell-max-stations.
+
+Run from the repository root: python benchmarks/report_render.py [--stations 2000 5000]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from openpyxl import Workbook
+from openpyxl.utils import get_column_letter
+from services.bulk_report_renderer import BulkReportRenderer
+from services.report_data_processor import ReportDataProcessor
+from services.report_formatter import ReportFormatter, NUM_COLUMNS, outline_border, style_id
+from services.report_layout import (
+    ReportLayoutPlanner, DATA_START_ROW, DETAIL_COLUMNS, DETAIL_OFFSET, HANDEDOVER_START, TAKENOVER_START
+)
+from services.station_counts import StationCounts
+from services.streaming_report_renderer import StreamingReportRenderer
+
+SHEET_TITLE = "Zonal Interchange Report"
+MAX_DETAILS = 6
+
+def synthetic_section(stations, rng):
+    """{station: {'ic_sttn', 'details', 'counts'}} like SectionAggregator builds"""
+    data = {}
+    for station in stations:
+        counts = StationCounts(**{field: rng.randint(0, 40) for field in StationCounts.FIELDS})
+        details = {
+            classification: [f"D{rng.randint(0, 999):03d}" for _ in range(rng.randint(0, MAX_DETAILS))]
+            for classification in DETAIL_COLUMNS
+        }
+        data[station] = {'ic_sttn': station, 'details': details, 'counts': counts}
+    return data
+
+def render_per_cell(handedover_data, takenover_data, handedover_stations, takenover_stations, formatter, output_path):
+    """Previous approach, station groups only: address writes, restyle every cell, merge"""
+    wb = Workbook()
+    ws = wb.active
+    ws.title = SHEET_TITLE
+    current_row = DATA_START_ROW
+
+    for i in range(max(len(handedover_stations), len(takenover_stations))):
+        sections = []
+        if i < len(handedover_stations):
+            sections.append((HANDEDOVER_START, handedover_data[handedover_stations[i]], True))
+        if i < len(takenover_stations):
+            sections.append((TAKENOVER_START, takenover_data[takenover_stations[i]], False))
+
+        group_rows = max([1] + [len(info['details'][name]) for _, info, _ in sections for name in DETAIL_COLUMNS])
+        end_row = current_row + group_rows - 1
+
+        for section_start, info, is_handedover in sections:
+            ws[f'{get_column_letter(section_start)}{current_row}'] = info['ic_sttn']
+            for offset, value in enumerate(info['counts'].display_values(is_handedover)):
+                ws[f'{get_column_letter(section_start + 1 + offset)}{current_row}'] = value
+            for offset, name in enumerate(DETAIL_COLUMNS):
+                letter = get_column_letter(section_start + DETAIL_OFFSET + offset)
+                for idx, station in enumerate(info['details'][name]):
+                    ws[f'{letter}{current_row + idx}'] = station
+
+        for row in range(current_row, end_row + 1):
+            for column in range(1, NUM_COLUMNS + 1):
+                font = 'station_trains' if row == current_row and column in (1, 2, 16, 17) else 'normal'
+                border = outline_border(row, column, current_row, end_row)
+                formatter.apply_style(ws.cell(row=row, column=column), style_id(font, 'center', border))
+
+        if end_row > current_row:
+            for section_start, _, _ in sections:
+                for column in range(section_start, section_start + 7):
+                    letter = get_column_letter(column)
+                    ws.merge_cells(f'{letter}{current_row}:{letter}{end_row}')
+
+        current_row = end_row + 1
+
+    wb.save(output_path)
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+def run(stations, seed, per_cell_max_stations):
+    rng = random.Random(seed)
+    names = [f"S{i:05d}" for i in range(stations)]
+    handedover_data = synthetic_section(names, rng)
+    takenover_data = synthetic_section(names[: stations * 9 // 10], rng)
+    handedover_stations = list(handedover_data)
+    takenover_stations = list(takenover_data)
+
+    formatter = ReportFormatter()
+    planner = ReportLayoutPlanner(formatter, ReportDataProcessor())
+
+    with tempfile.TemporaryDirectory() as workdir:
+        per_cell = None
+        if stations <= per_cell_max_stations:
+            _, per_cell = timed(
+                render_per_cell, handedover_data, takenover_data, handedover_stations, takenover_stations,
+                formatter, os.path.join(workdir, 'per_cell.xlsx')
+            )
+        layout, plan = timed(planner.plan, handedover_data, takenover_data, handedover_stations, takenover_stations)
+        _, bulk = timed(BulkReportRenderer(formatter).render, layout, os.path.join(workdir, 'bulk.xlsx'), SHEET_TITLE)
+        _, streaming = timed(
+            StreamingReportRenderer(formatter).render, layout, os.path.join(workdir, 'streaming.xlsx'), SHEET_TITLE
+        )
+
+    cells = sum(len(columns) for columns in layout.cells.values())
+    print(f"{stations} stations, {layout.last_row} rows, {cells} cells")
+    if per_cell is None:
+        print(f"per-cell (groups only)  skipped, stations > {per_cell_max_stations}")
+    else:
+        print(f"per-cell (groups only)  {per_cell * 1000:8.1f} ms")
+    print(f"plan                    {plan * 1000:8.1f} ms")
+    print(f"bulk openpyxl write     {bulk * 1000:8.1f} ms  plan + write {(plan + bulk) * 1000:8.1f} ms")
+    print(f"streaming xlsxwriter    {streaming * 1000:8.1f} ms  plan + write {(plan + streaming) * 1000:8.1f} ms")
+    if per_cell is not None:
+        print(f"speedup (openpyxl)      {per_cell / (plan + bulk):.1f}x")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--stations', type=int, nargs='+', default=[100, 300, 2000, 5000])
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--per-cell-max-stations', type=int, default=300)
+    args = parser.parse_args()
+
+    for stations in args.stations:
+        run(stations, args.seed, args.per_cell_max_stations)
+        print()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,225 @@
+"""Synthetic TRAINWISE INTERCHANGE exports for benchmarking
+
+Writes files in the upload format: two preamble rows, the full 82 column
+header, then one row per interchange with zone, station, wagon type and
+loco distributions close to real exports. SAU and CNA rows, light engine
+and loco change rows, blank sections and messy text are mixed in so every
+conversion and aggregation path is exercised.
+
+Run from the repository root: python benchmarks/synthetic_export.py rows [output.csv] [seed]
+"""
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+HEADER = (
+    'DATE,ZONE FROM,ZONE TO,IC STTN,'
+    'TAKEN OVER SR.NO.,TAKEN OVER DRTN,TAKEN OVER STTN FROM,TAKEN OVER DVSN FROM,TAKEN OVER ZONE FROM,'
+    'TAKEN OVER STTN TO,TAKEN OVER DVSN TO,TAKEN OVER ZONE TO,TAKEN OVER OWNR,TAKEN OVER LOAD NAME,'
+    'TAKEN OVER L/E,TAKEN OVER CMDT,TAKEN OVER CNSR,TAKEN OVER CNSG,TAKEN OVER TYPE,'
+    'TAKEN OVER MULTIDSTN DVSN(DSTN),TAKEN OVER MULTIDSTN UNITS,TAKEN OVER DS,TAKEN OVER 8W(L),'
+    'TAKEN OVER 8W(E),TAKEN OVER 8W(BV),TAKEN OVER TOTL(8W),TAKEN OVER OWNG,TAKEN OVER LOCO,'
+    'TAKEN OVER LOCO TYPE,TAKEN OVER LOCO UNTS,TAKEN OVER LOCO HRP,TAKEN OVER TIME,TAKEN OVER CC+6,'
+    'TAKEN OVER CC+8,TAKEN OVER RAKEID,TAKEN OVER TWIN PIPE,TAKEN OVER CTGR,TAKEN OVER EXAM TYPE,'
+    'TAKEN OVER TONNAGE(in Tonnes),TAKEN OVER LDNG DATE,'
+    'HANDED  OVER INTERCHANGE POINT STATION,HANDED  OVER INTERCHANGE POINT DIVISION,'
+    'HANDED  OVER INTERCHANGE POINT ZONE,HANDED OVER SR.NO.,TAKEN OVER INTERCHANGE  POINT STATION,'
+    'TAKEN OVER INTERCHANGE  POINT DIVISION,TAKEN OVER INTERCHANGE  POINT ZONE,'
+    'HANDED OVER DRTN,HANDED OVER STTN FROM,HANDED OVER DVSN FROM,HANDED OVER ZONE FROM,'
+    'HANDED OVER STTN TO,HANDED OVER DVSN TO,HANDED OVER ZONE TO,HANDED OVER OWNR,HANDED OVER LOAD NAME,'
+    'HANDED OVER L/E,HANDED OVER CMDT,HANDED OVER CNSR,HANDED OVER CNSG,HANDED OVER TYPE,'
+    'HANDED OVER MULTIDSTN DVSN(DSTN),HANDED OVER MULTIDSTN UNITS,HANDED OVER DS,HANDED OVER 8W(L),'
+    'HANDED OVER 8W(E),HANDED OVER 8W(BV),HANDED OVER TOTL(8W),HANDED OVER OWNG,HANDED OVER LOCO,'
+    'HANDED OVER LOCO TYPE,HANDED OVER LOCO UNTS,HANDED OVER LOCO HRP,HANDED OVER TIME,HANDED OVER CC+6,'
+    'HANDED OVER CC+8,HANDED OVER RAKEID,HANDED OVER TWIN PIPE,HANDED OVER CTGR,HANDED OVER EXAM TYPE,'
+    'HANDED OVER TONNAGE(in Tonnes),HANDED OVER LDNG DATE'
+).split(',')
+
+SECTIONS = ('TAKEN OVER ', 'HANDED OVER ')
+
+# (ZONE TO, IC STTN, weight), SAU and CNA rows hit the station conversions
+INTERCHANGES = [
+    ('CR', 'BSR', 17), ('CR', 'JL', 11), ('CR', 'KNW', 3),
+    ('WC', 'SHRN', 8), ('WC', 'NAD', 6), ('WC', 'MKC', 3), ('WC', 'MTA', 2), ('WC', 'CNA', 3),
+    ('NW', 'BEC', 2), ('NW', 'CNA', 2), ('NW', 'HMT', 1), ('NW', 'BLDI', 5), ('NW', 'PNU', 2),
+    ('DFCR', 'BHU', 2), ('DFCR', 'CECC', 10), ('DFCR', 'GGM', 3), ('DFCR', 'MSH', 2), ('DFCR', 'SAU', 7),
+    ('DFCR', 'MPR', 2), ('DFCR', 'GTX', 1), ('DFCR', 'PAO', 1), ('DFCR', 'NOL', 1), ('DFCR', 'BHET', 1),
+    ('DFCR', 'SAH', 1), ('DFCR', 'SJN', 2),
+    # Not in the station order, sorted after the known stations of the zone
+    ('WC', 'KTE', 1), ('DFCR', 'RDP', 1),
+]
+
+# Zones on the far side of the interchange, half of them turn SAU into SAUS
+PARTNER_ZONES = [
+    ('CR', 22), ('NR', 15), ('SEC', 10), ('NW', 8), ('WR', 8), ('NC', 6), ('SW', 5),
+    ('WC', 5), ('SR', 3), ('ECO', 3), ('KR', 2), ('SC', 2), ('NE', 1),
+]
+
+WAGON_TYPES = [
+    ('BLC', 30), ('BCN', 16), ('BOXNHL', 8), ('BOXN', 6), ('BTPN', 5), ('NMG', 5), ('BCNHL', 4),
+    ('BLLM', 3), ('BTPGLN', 1), ('BTPG', 2), ('BOST', 2), ('BRN', 2), ('BFNS', 1), ('BCNA', 1),
+    ('BOXNS', 1), ('SHRA', 1), ('BCACBM', 1), ('MYLY', 1),
+    # Unclassified types
+    ('BVZI', 1), ('NMGHSX', 1),
+]
+
+LOCO_TYPES = [
+    ('WAG9HC', 40), ('WAG7', 11), ('WAG12B', 11), ('WDG4G', 8), ('WAG9H', 6), ('WAG5H', 4),
+    ('WDG4', 3), ('WDG6G', 1), ('WAP7', 1),
+]
+
+# Wagon types of light engine / loco change rows (data/locoChange.csv)
+LOCO_CHANGE_TYPES = ['LE', 'CLE', 'L/E']
+
+# Section kinds: full rake, light engine (loco change type), loco only (no destination), blank
+KIND_WEIGHTS = {
+    'TAKEN OVER ': [0.74, 0.05, 0.09, 0.12],
+    'HANDED OVER ': [0.70, 0.05, 0.07, 0.18],
+}
+RAKE, LIGHT_ENGINE, LOCO_ONLY, BLANK = range(4)
+
+# Values of the descriptive columns, repeated so the file has realistic width
+FILLERS = {
+    'DRTN': ['KYN', 'BSR', 'JL', 'NAD', 'BLDI'],
+    'STTN FROM': ['JNPT', 'KYN', 'NVS', 'MDCC', 'ICDD'],
+    'DVSN FROM': ['BB', 'BCT', 'ADI', 'RTM'],
+    'DVSN TO': ['BCT', 'BRC', 'SA', 'JP'],
+    'OWNR': ['CNCR', 'IR', 'GDL', 'ADNI'],
+    'LOAD NAME': ['CONCOR-V-=775', 'KYN/BSR', 'GDL-77'],
+    'CMDT': ['CONT', 'W', 'CEMT', 'POL', 'COAL'],
+    'CNSR': ['CONR', 'SIPK', 'ACC'],
+    'CNSG': ['CONR', 'SIPK', 'UTCL'],
+    'DS': ['N'],
+    'OWNG': ['NR', 'WC', 'NC', 'CR'],
+    'LOCO UNTS': ['SU', 'MU'],
+    'LOCO HRP': ['S', 'N'],
+    'TIME': ['1:12', '1:29', '2:05', '0:47'],
+    'CC+8': ['Y'],
+    'RAKEID': ['RYD 121124002252', 'DSN 241124164816', 'VGLJ310525124750'],
+    'TWIN PIPE': ['N', 'Y'],
+    'CTGR': ['C', 'P'],
+    'EXAM TYPE': ['Valid CC', 'Premium Due', 'Invalid Premium'],
+    'LDNG DATE': ['15:15 20-06-25', '09:40 21-06-25'],
+}
+
+def _weighted(table):
+    values, weights = zip(*table)
+    weights = np.asarray(weights, dtype=float)
+    return np.asarray(values, dtype=object), weights / weights.sum()
+
+def _choice(rng, table, size):
+    values, weights = _weighted(table)
+    return values[rng.choice(len(values), size=size, p=weights)]
+
+def _section(rng, prefix, kinds, partner_zone):
+    """Columns of one TAKEN OVER / HANDED OVER section for the rows of a chunk"""
+    size = len(kinds)
+    active = kinds != BLANK
+    rake = kinds == RAKE
+    moving = (kinds == RAKE) | (kinds == LIGHT_ENGINE)
+    blank = np.full(size, '', dtype=object)
+
+    def only(mask, values):
+        return np.where(mask, values, blank)
+
+    wagon_type = _choice(rng, WAGON_TYPES, size)
+    # A few hand-typed values with stray case and padding
+    messy = rng.random(size) < 0.01
+    wagon_type[messy] = [f" {value.lower()}" for value in wagon_type[messy]]
+    wagon_type = np.where(kinds == LIGHT_ENGINE, rng.choice(LOCO_CHANGE_TYPES, size=size), wagon_type)
+
+    loads = rng.integers(38, 59, size=size)
+    loaded = rng.random(size) < 0.77
+    wagons_loaded = np.where(loaded, loads, 0)
+    wagons_empty = np.where(loaded, 0, loads)
+    brake_vans = rng.integers(0, 2, size=size)
+    totals = np.char.add(np.char.add(wagons_loaded.astype(str), '.0+'), brake_vans.astype(str))
+    totals = np.char.add(totals, '.0').astype(object)
+
+    zone_column = 'ZONE FROM' if prefix == 'TAKEN OVER ' else 'ZONE TO'
+    other_zone_column = 'ZONE TO' if prefix == 'TAKEN OVER ' else 'ZONE FROM'
+
+    columns = {
+        'SR.NO.': only(active, np.arange(1, size + 1).astype(str).astype(object)),
+        zone_column: only(active, partner_zone),
+        other_zone_column: only(active, _choice(rng, PARTNER_ZONES, size)),
+        'STTN TO': only(moving, _choice(rng, [(station, w) for _, station, w in INTERCHANGES], size)),
+        'L/E': only(rake, np.where(loaded, 'L', 'E').astype(object)),
+        'TYPE': only(moving, wagon_type),
+        '8W(L)': only(rake, wagons_loaded.astype(str).astype(object)),
+        '8W(E)': only(rake, wagons_empty.astype(str).astype(object)),
+        '8W(BV)': only(rake, brake_vans.astype(str).astype(object)),
+        'TOTL(8W)': only(rake, totals),
+        'LOCO': only(active, rng.integers(20000, 60000, size=size).astype(str).astype(object)),
+        'LOCO TYPE': only(active, _choice(rng, LOCO_TYPES, size)),
+        'TONNAGE(in Tonnes)': only(rake, np.round(rng.uniform(0, 4000, size=size), 2).astype(str).astype(object)),
+    }
+    for suffix, pool in FILLERS.items():
+        columns.setdefault(suffix, only(rake, rng.choice(np.asarray(pool, dtype=object), size=size)))
+
+    return {prefix + suffix: values for suffix, values in columns.items()}
+
+def generate_chunk(rng, kinds, date):
+    """DataFrame of export rows (all columns as text) for the given section kinds"""
+    taken_kinds, handed_kinds = kinds
+    size = len(taken_kinds)
+
+    zones, stations, weights = zip(*INTERCHANGES)
+    weights = np.asarray(weights, dtype=float)
+    picks = rng.choice(len(stations), size=size, p=weights / weights.sum())
+    zone_to = np.asarray(zones, dtype=object)[picks]
+    ic_sttn = np.asarray(stations, dtype=object)[picks]
+
+    columns = {
+        'DATE': np.full(size, date, dtype=object),
+        'ZONE FROM': np.full(size, 'WR', dtype=object),
+        'ZONE TO': zone_to,
+        'IC STTN': ic_sttn,
+    }
+    for prefix, section_kinds in zip(SECTIONS, kinds):
+        columns.update(_section(rng, prefix, section_kinds, _choice(rng, PARTNER_ZONES, size)))
+
+    blank = np.full(size, '', dtype=object)
+    return pd.DataFrame({column: columns.get(column, blank) for column in HEADER}, columns=HEADER)
+
+def _preamble(date, taken, handed):
+    """The two rows above the header, padded to the header width like the real export"""
+    padding = ',' * (len(HEADER) - 1)
+    summary = (
+        f"[  Zone: WR,  DateFrom: {date},  DateTo: {date},  Gauge: BG,;  "
+        f"TakenOver: {taken}={taken}+0;  HandedOver: {handed}={handed}+0 ]"
+    )
+    return [
+        'MA4 TRAINWISE INTERCHANGE' + padding,
+        summary + ',' * (len(HEADER) - 1 - summary.count(',')),
+    ]
+
+def write_export(path, rows, seed=0, date='22-06-2025', chunk_rows=100000):
+    """Write a synthetic export of `rows` rows to path, returns path"""
+    rng = np.random.default_rng(seed)
+
+    # Section kinds are drawn up front so the preamble can carry the totals
+    kinds = [
+        rng.choice(4, size=rows, p=KIND_WEIGHTS[prefix]).astype(np.int8)
+        for prefix in SECTIONS
+    ]
+    taken = int((kinds[0] != BLANK).sum())
+    handed = int((kinds[1] != BLANK).sum())
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        f.write('\n'.join(_preamble(date, taken, handed)) + '\n')
+        f.write(','.join(HEADER) + '\n')
+        for start in range(0, rows, chunk_rows):
+            stop = min(start + chunk_rows, rows)
+            chunk = generate_chunk(rng, (kinds[0][start:stop], kinds[1][start:stop]), date)
+            chunk.to_csv(f, header=False, index=False, lineterminator='\n')
+
+    return path
+
+if __name__ == '__main__':
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    output = sys.argv[2] if len(sys.argv) > 2 else f"synthetic_{rows}.csv"
+    seed = int(sys.argv[3]) if len(sys.argv) > 3 else 0
+    print(write_export(output, rows, seed))
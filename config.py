@@ -1,3 +1,4 @@
+import logging
 import os
 import sys
 
@@ -48,29 +49,107 @@ class Config:
     
     # File upload settings - adaptive paths
     UPLOAD_FOLDER = get_writable_path('uploads') if BASE_PATH == os.path.abspath(".") else os.path.join(BASE_PATH, 'uploads')
-    MAX_CONTENT_LENGTH = 16 * 1024 * 1024
+    MAX_CONTENT_LENGTH = int(os.environ.get('MAX_CONTENT_LENGTH', 512 * 1024 * 1024))
     ALLOWED_EXTENSIONS = {'csv'}
     
     # Output settings - adaptive paths
     INTERMEDIATE_FOLDER = get_writable_path('intermediate') if BASE_PATH == os.path.abspath(".") else os.path.join(BASE_PATH, 'intermediate')
     REPORTS_FOLDER = get_writable_path('reports') if BASE_PATH == os.path.abspath(".") else os.path.join(BASE_PATH, 'reports')
     DATA_FOLDER = get_writable_path('data') if BASE_PATH == os.path.abspath(".") else os.path.join(BASE_PATH, 'data')
+    REPORT_CACHE_FOLDER = get_writable_path('report_cache') if BASE_PATH == os.path.abspath(".") else os.path.join(BASE_PATH, 'report_cache')
+    
+    # Only write *_processed.xlsx when explicitly requested
+    WRITE_INTERMEDIATE_XLSX = os.environ.get('WRITE_INTERMEDIATE_XLSX', '').lower() in ('1', 'true', 'yes')
+    
+    # Processed frames and aggregates per zone and report day, as Arrow files (needs pyarrow)
+    PROCESSED_STORE_FOLDER = os.path.join(INTERMEDIATE_FOLDER, 'days')
+    PROCESSED_STORE_ENABLED = os.environ.get('PROCESSED_STORE_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    # Least recently used days are removed over the byte limit, days unused for the TTL always, 0 means no
+    # limit. Applied after every stored day and by the storage sweeper (its 'processed_days' area)
+    PROCESSED_STORE_MAX_BYTES = int(os.environ.get('PROCESSED_STORE_MAX_BYTES', 1024 * 1024 * 1024))
+    PROCESSED_STORE_TTL_SECONDS = int(os.environ.get('PROCESSED_STORE_TTL_SECONDS', 30 * 24 * 3600))
+    
+    # Final report backend: 'openpyxl' or streaming 'xlsxwriter'
+    REPORT_RENDERER = os.environ.get('REPORT_RENDERER', 'openpyxl')
+    
+    # CSV parser: 'auto' (pyarrow when installed), 'c' or 'pyarrow'
+    CSV_ENGINE = os.environ.get('CSV_ENGINE', 'auto')
+    
+    # Uploads larger than this are read and aggregated in chunks of rows
+    STREAMING_THRESHOLD_BYTES = int(os.environ.get('STREAMING_THRESHOLD_BYTES', 16 * 1024 * 1024))
+    STREAMING_CHUNK_ROWS = int(os.environ.get('STREAMING_CHUNK_ROWS', 50000))
+    
+    # Parsed upload cache limits (per worker)
+    PARSE_CACHE_MAX_ENTRIES = int(os.environ.get('PARSE_CACHE_MAX_ENTRIES', 8))
+    PARSE_CACHE_MAX_BYTES = int(os.environ.get('PARSE_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+    
+    # Cached stage outputs (sorted frame, classifications, aggregates) per upload (per worker)
+    STAGE_CACHE_MAX_ENTRIES = int(os.environ.get('STAGE_CACHE_MAX_ENTRIES', 4))
+    STAGE_CACHE_MAX_BYTES = int(os.environ.get('STAGE_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+    
+    # Background report jobs: each worker process runs its own, their state files
+    # let any worker report on them. Jobs whose state file misses 3 heartbeats are
+    # reported failed (their process stopped), 0 disables that check.
+    JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 2))
+    JOB_MAX_RETRIES = int(os.environ.get('JOB_MAX_RETRIES', 1))
+    JOB_RETRY_DELAY = float(os.environ.get('JOB_RETRY_DELAY', 2))
+    JOB_RETENTION_SECONDS = int(os.environ.get('JOB_RETENTION_SECONDS', 3600))
+    JOB_STATE_FOLDER = os.path.join(INTERMEDIATE_FOLDER, 'jobs')
+    JOB_HEARTBEAT_SECONDS = int(os.environ.get('JOB_HEARTBEAT_SECONDS', 10))
+    
+    # Generated report cache shared by all workers on disk, 0 disables it
+    REPORT_CACHE_MAX_BYTES = int(os.environ.get('REPORT_CACHE_MAX_BYTES', 512 * 1024 * 1024))
+    
+    # Disk quotas (bytes) and TTLs (seconds) of uploads and generated files, 0 means no limit.
+    # They apply to each folder as a whole: every worker process sweeps the same folders
+    UPLOAD_QUOTA_BYTES = int(os.environ.get('UPLOAD_QUOTA_BYTES', 1024 * 1024 * 1024))
+    UPLOAD_TTL_SECONDS = int(os.environ.get('UPLOAD_TTL_SECONDS', 24 * 3600))
+    INTERMEDIATE_QUOTA_BYTES = int(os.environ.get('INTERMEDIATE_QUOTA_BYTES', 256 * 1024 * 1024))
+    INTERMEDIATE_TTL_SECONDS = int(os.environ.get('INTERMEDIATE_TTL_SECONDS', 6 * 3600))
+    REPORTS_QUOTA_BYTES = int(os.environ.get('REPORTS_QUOTA_BYTES', 512 * 1024 * 1024))
+    REPORTS_TTL_SECONDS = int(os.environ.get('REPORTS_TTL_SECONDS', 24 * 3600))
+    
+    # Files used more recently than this are never removed, the sweeper runs every
+    # STORAGE_SWEEP_INTERVAL seconds (0 disables it)
+    STORAGE_MIN_AGE_SECONDS = int(os.environ.get('STORAGE_MIN_AGE_SECONDS', 600))
+    STORAGE_SWEEP_INTERVAL = int(os.environ.get('STORAGE_SWEEP_INTERVAL', 300))
+    
+    # /admin endpoints answer only local requests unless this is set
+    ADMIN_ALLOW_REMOTE = os.environ.get('ADMIN_ALLOW_REMOTE', '').lower() in ('1', 'true', 'yes')
+    
+    # Batch processing pool size, 0 uses every CPU core
+    BATCH_WORKERS = int(os.environ.get('BATCH_WORKERS', 0))
+    
+    # Logging level of the app's own messages, DEBUG brings back the old debug output
+    LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+    
+    # /metrics answers only local requests unless this is set
+    METRICS_ALLOW_REMOTE = os.environ.get('METRICS_ALLOW_REMOTE', '').lower() in ('1', 'true', 'yes')
     
     # Data files
     PH_STATIONS_FILE = os.path.join(DATA_FOLDER, 'ph_stations.csv')
     WAGON_CLASSIFICATIONS_FILE = os.path.join(DATA_FOLDER, 'wagon_classifications.csv')
+    LOCOCHANGE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'locoChange.csv')
+    STATION_TOPOLOGY_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'station_topology.csv')
+    STATION_RULES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'station_rules.csv')
     
     @staticmethod
     def init_app():
-        print(f"=== CONFIG DEBUG ===")
-        print(f"BASE_PATH: {Config.BASE_PATH}")
-        print(f"INTERMEDIATE_FOLDER: {Config.INTERMEDIATE_FOLDER}")
-        print(f"REPORTS_FOLDER: {Config.REPORTS_FOLDER}")
+        # No-op when the server already configured logging
+        logging.basicConfig(format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+        logging.getLogger('services').setLevel(Config.LOG_LEVEL)
+        logging.getLogger('routes').setLevel(Config.LOG_LEVEL)
+        
+        logger = logging.getLogger('config')
+        logger.setLevel(Config.LOG_LEVEL)
+        logger.debug("BASE_PATH: %s", Config.BASE_PATH)
+        logger.debug("INTERMEDIATE_FOLDER: %s", Config.INTERMEDIATE_FOLDER)
+        logger.debug("REPORTS_FOLDER: %s", Config.REPORTS_FOLDER)
         
         for folder in [Config.UPLOAD_FOLDER, Config.INTERMEDIATE_FOLDER, 
                       Config.REPORTS_FOLDER, Config.DATA_FOLDER]:
             os.makedirs(folder, exist_ok=True)
-            print(f"Created/verified: {folder}")
+            logger.debug("Created/verified: %s", folder)
         Config._create_default_data_files()
     
     @staticmethod 
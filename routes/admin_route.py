@@ -0,0 +1,24 @@
+from flask import Blueprint, abort, jsonify, request
+from config import Config
+from routes.metrics_route import LOCAL_ADDRESSES
+from services.report_cache import report_cache
+from services.storage_manager import storage_manager
+
+admin_bp = Blueprint('admin', __name__)
+
+@admin_bp.before_request
+def local_only():
+    if not Config.ADMIN_ALLOW_REMOTE and request.remote_addr not in LOCAL_ADDRESSES:
+        abort(403)
+
+@admin_bp.route('/admin/storage')
+def storage_usage():
+    """Disk usage of the managed folders and the processed day store, plus the report cache"""
+    usage = storage_manager.usage()
+    usage['report_cache'] = report_cache.stats()
+    return jsonify(usage)
+
+@admin_bp.route('/admin/storage/sweep', methods=['POST'])
+def sweep_storage():
+    """Run a sweep now instead of waiting for the sweeper"""
+    return jsonify(storage_manager.sweep())
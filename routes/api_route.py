@@ -0,0 +1,87 @@
+from flask import Blueprint, Response, request, jsonify
+import gzip
+import json
+import os
+from config import Config
+from services.csv_processor import MissingColumnsError
+from services.report_pipeline import ReportPipeline
+from services.station_counts import StationCounts
+from services.storage_manager import storage_manager
+
+api_bp = Blueprint('api', __name__)
+
+SUMMARY_FIELDS = ('stations', 'handedover_data', 'takenover_data', 'totals')
+
+# Responses smaller than this are not worth compressing
+GZIP_MIN_BYTES = 1024
+
+class UnknownFieldError(Exception):
+    """A ?fields= entry that is not a summary field"""
+
+def to_json_value(value):
+    """StationCounts as dicts, NaN (blank STTN TO or TYPE) as null"""
+    if isinstance(value, StationCounts):
+        return value.to_dict()
+    if isinstance(value, dict):
+        return {str(key): to_json_value(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_json_value(item) for item in value]
+    if isinstance(value, float) and value != value:
+        return None
+    if hasattr(value, 'item'):
+        # numpy scalars
+        return value.item()
+    return value
+
+def select_fields(summary, fields):
+    """Keep the requested fields: 'totals', or per station 'handedover_data.counts'"""
+    selected = {}
+    for field in fields:
+        name, _, station_field = field.partition('.')
+        if name not in SUMMARY_FIELDS:
+            raise UnknownFieldError(f"Unknown field: {field}")
+        value = summary[name]
+        if station_field:
+            if name not in ('handedover_data', 'takenover_data'):
+                raise UnknownFieldError(f"Unknown field: {field}")
+            previous = selected.get(name, {})
+            value = {
+                station: dict(previous.get(station, {}), **{station_field: data[station_field]})
+                for station, data in value.items() if station_field in data
+            }
+        selected[name] = value
+    return selected
+
+def json_response(payload, status=200):
+    """JSON response, gzip encoded when the client accepts it"""
+    body = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    response = Response(body, status=status, mimetype='application/json')
+    response.vary.add('Accept-Encoding')
+    if len(body) >= GZIP_MIN_BYTES and 'gzip' in request.accept_encodings:
+        response.set_data(gzip.compress(body, compresslevel=6))
+        response.headers['Content-Encoding'] = 'gzip'
+    return response
+
+@api_bp.route('/api/aggregates/<filename>')
+def aggregates(filename):
+    """Report numbers of an upload as JSON, without building the workbook
+    
+    ?fields=stations,totals,handedover_data.counts limits the response.
+    """
+    file_path = os.path.join(Config.UPLOAD_FOLDER, filename)
+    if not os.path.exists(file_path):
+        return jsonify({'error': f'File not found: {filename}'}), 404
+    storage_manager.touch(file_path)
+    
+    fields = [field.strip() for field in request.args.get('fields', '').split(',') if field.strip()]
+    try:
+        summary, cached = ReportPipeline().report_summary(filename)
+        if fields:
+            summary = select_fields(summary, fields)
+    except (UnknownFieldError, MissingColumnsError) as e:
+        # Only a bad request, anything else is an error of the server
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': f'Error processing file: {str(e)}'}), 500
+    
+    return json_response(dict(to_json_value(summary), filename=filename, cached=cached))
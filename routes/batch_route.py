@@ -0,0 +1,76 @@
+from flask import Blueprint, render_template, request, flash, redirect, url_for, jsonify
+import os
+from werkzeug.utils import secure_filename
+from config import Config
+from routes.process_route import job_status, wants_json
+from routes.upload_route import allowed_file
+from services.artifact_index import artifact_index
+from services.batch_processor import BatchProcessor
+from services.job_queue import job_queue
+from services.storage_manager import storage_manager
+
+batch_bp = Blueprint('batch', __name__)
+
+def generate_batch(*filenames, rejected=()):
+    """Job body: run every upload through the pool and zip the reports
+    
+    The uploads are positional arguments, so the storage sweeper of every
+    server process keeps them while the job is unfinished.
+    """
+    processor = BatchProcessor()
+    results = processor.process(list(filenames)) + list(rejected)
+    
+    if job_queue.cancel_requested():
+        return None, 'Cancelled'
+    if not any(report_path for _, report_path, _ in results):
+        return None, '; '.join(f'{filename}: {message}' for filename, _, message in results)
+    
+    zip_path = processor.write_zip(results)
+    failed = sum(1 for _, report_path, _ in results if not report_path)
+    return zip_path, f"{len(results) - failed} of {len(results)} files processed"
+
+@batch_bp.route('/batch', methods=['GET', 'POST'])
+def batch_process():
+    if request.method == 'GET':
+        return render_template('batch.html')
+    
+    try:
+        files = [file for file in request.files.getlist('files') if file.filename]
+        if not files:
+            flash('No file selected')
+            return redirect(request.url)
+        
+        # Files that can't be processed are reported in the zip summary
+        filenames = []
+        rejected = []
+        for file in files:
+            filename = secure_filename(file.filename)
+            if not allowed_file(filename):
+                rejected.append((file.filename, None, 'Not a CSV file'))
+            elif filename in filenames:
+                rejected.append((file.filename, None, 'Duplicate file name in batch'))
+            else:
+                file_path = os.path.join(Config.UPLOAD_FOLDER, filename)
+                file.save(file_path)
+                artifact_index.register(file_path)
+                storage_manager.touch(file_path)
+                filenames.append(filename)
+        
+        if not filenames:
+            for filename, _, message in rejected:
+                flash(f'{filename}: {message}')
+            return redirect(request.url)
+        
+        # Like /process, the reports are generated by a background worker and the page polls for the zip
+        job = job_queue.submit(
+            generate_batch, *filenames, rejected=rejected, max_retries=0,
+            description=f"batch of {len(filenames)} files", discard=BatchProcessor.discard_zip
+        )
+        
+        if wants_json():
+            return jsonify(job_status(job)), 202
+        return render_template('process.html', filename=', '.join(filenames), job=job_status(job))
+        
+    except Exception as e:
+        flash(f'Error processing batch: {str(e)}')
+        return redirect(url_for('batch.batch_process'))
@@ -1,41 +1,69 @@
-from flask import Blueprint, send_file, flash, redirect, url_for
+from flask import Blueprint, send_file, flash, redirect, url_for, request, jsonify, abort
+import logging
 import os
-from config import Config
+from services.artifact_index import artifact_index
+from services.processed_store import processed_store
+from services.storage_manager import storage_manager
+from services.xlsx_generator import XLSXGenerator
+
+logger = logging.getLogger(__name__)
 
 download_bp = Blueprint('download', __name__)
 
 @download_bp.route('/download/<filename>')
 def download_file(filename):
     try:
-        # Check multiple folders based on filename
-        if filename.endswith('_final_report.xlsx'):
-            # Final reports are in reports folder
-            file_path = os.path.join(Config.REPORTS_FOLDER, filename)
-        elif filename.endswith('_processed.xlsx'):
-            # Intermediate files are in intermediate folder
-            file_path = os.path.join(Config.INTERMEDIATE_FOLDER, filename)
-        else:
-            # Other files might be in uploads folder
-            file_path = os.path.join(Config.UPLOAD_FOLDER, filename)
-        
-        # Debug output
-        print(f"Looking for file: {filename}")
-        print(f"File path: {file_path}")
-        print(f"File exists: {os.path.exists(file_path)}")
+        # Path, size and content hash come from the index, no folder probing
+        artifact = artifact_index.resolve(filename)
+        logger.debug("Download %s resolved to %s", filename, artifact.path if artifact else None)
         
-        if os.path.exists(file_path):
-            return send_file(file_path, as_attachment=True)
-        else:
-            # Try to find the file in any of the directories
-            for folder in [Config.REPORTS_FOLDER, Config.INTERMEDIATE_FOLDER, Config.UPLOAD_FOLDER]:
-                alt_path = os.path.join(folder, filename)
-                if os.path.exists(alt_path):
-                    print(f"Found file in alternative location: {alt_path}")
-                    return send_file(alt_path, as_attachment=True)
-            
+        if artifact is None:
             flash(f'File not found: {filename}')
             return redirect(url_for('upload.upload'))
+        
+        storage_manager.touch(artifact.path)
+        
+        # The content hash as ETag answers If-None-Match with 304, and
+        # conditional sending serves Range requests as 206 partial content
+        return send_file(artifact.path, as_attachment=True, download_name=artifact.name,
+                         etag=artifact.etag, conditional=True, max_age=0)
             
     except Exception as e:
         flash(f'Error downloading file: {str(e)}')
         return redirect(url_for('upload.upload'))
+
+@download_bp.route('/processed')
+def processed_days():
+    """Stored processed days, newest first"""
+    return jsonify(processed_store.days(request.args.get('zone')))
+
+@download_bp.route('/processed/<zone>/<report_date>')
+def processed_preview(zone, report_date):
+    """First rows of a stored day as JSON, read from the memory-mapped frame"""
+    try:
+        rows = min(int(request.args.get('rows', 50)), 1000)
+        preview = processed_store.preview(zone, report_date, rows)
+    except ValueError:
+        abort(404)
+    if preview is None:
+        abort(404)
+    
+    preview = preview.astype(object).where(preview.notna(), None)
+    return jsonify({
+        'meta': processed_store.get_meta(zone, report_date),
+        'columns': list(preview.columns),
+        'rows': preview.values.tolist()
+    })
+
+@download_bp.route('/processed/<zone>/<report_date>.xlsx')
+def processed_xlsx(zone, report_date):
+    """XLSX view of a stored day, written on demand"""
+    try:
+        frame = processed_store.get_frame(zone, report_date)
+    except ValueError:
+        abort(404)
+    if frame is None:
+        abort(404)
+    
+    output_path = XLSXGenerator().write_intermediate_xlsx(frame, f"{zone.upper()}_{report_date}")
+    return redirect(url_for('download.download_file', filename=os.path.basename(output_path)))
@@ -0,0 +1,31 @@
+from flask import Blueprint, Response, abort, request
+from config import Config
+from services.artifact_index import artifact_index
+from services.job_queue import job_queue
+from services.metrics import metrics
+from services.report_cache import report_cache
+from services.storage_manager import storage_manager
+
+metrics_bp = Blueprint('metrics', __name__)
+
+LOCAL_ADDRESSES = ('127.0.0.1', '::1', 'localhost')
+
+@metrics_bp.route('/metrics')
+def metrics_view():
+    """Stage histograms of this worker process in Prometheus text format"""
+    if not Config.METRICS_ALLOW_REMOTE and request.remote_addr not in LOCAL_ADDRESSES:
+        abort(403)
+    
+    job_stats = job_queue.stats()
+    cache_stats = report_cache.stats()
+    storage_areas = storage_manager.usage()['areas']
+    gauges = {
+        'conv_jobs': ('Report jobs by state', {(('state', state),): count for state, count in job_stats['jobs'].items()}),
+        'conv_jobs_queued': ('Report jobs waiting for a worker', {(): job_stats['queued']}),
+        'conv_report_cache_entries': ('Reports in the cache', {(): cache_stats['entries']}),
+        'conv_report_cache_bytes': ('Size of the report cache', {(): cache_stats['bytes']}),
+        'conv_storage_bytes': ('Size of the managed folders', {(('area', name),): area['bytes'] for name, area in storage_areas.items()}),
+        'conv_storage_files': ('Files in the managed folders', {(('area', name),): area['files'] for name, area in storage_areas.items()}),
+        'conv_artifacts_indexed': ('Downloadable files in the artifact index', {(): artifact_index.stats()['artifacts']}),
+    }
+    return Response(metrics.render(gauges), mimetype='text/plain; version=0.0.4')
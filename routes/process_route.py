@@ -1,17 +1,43 @@
 from flask import Blueprint, render_template, request, flash, redirect, url_for, jsonify
 import json
-from services.csv_processor import CSVProcessor
-from services.xlsx_generator import XLSXGenerator
-from services.final_report_generator import FinalReportGenerator
-from services.report_data_processor import ReportDataProcessor
-import pandas as pd
+from config import Config
+from services.job_queue import job_queue, SUCCEEDED
+from services.report_pipeline import ReportPipeline
+from services.storage_manager import storage_manager
 import os
 
 process_bp = Blueprint('process', __name__)
 
+def generate_report(filename, upload_digest=None):
+    """Job body: parse, aggregate and render the final report in memory"""
+    return ReportPipeline().run(filename, upload_digest, cancelled=job_queue.cancel_requested)
+
+def wants_json():
+    if request.args.get('format') == 'json':
+        return True
+    best = request.accept_mimetypes.best_match(['application/json', 'text/html'])
+    return best == 'application/json' and request.accept_mimetypes[best] > request.accept_mimetypes['text/html']
+
+def job_status(job):
+    status = job.to_dict()
+    status['status_url'] = url_for('process.job_status_view', job_id=job.id)
+    status['cancel_url'] = url_for('process.cancel_job', job_id=job.id)
+    if job.state == SUCCEEDED:
+        # CORRECT - extract just the filename
+        status['download_url'] = url_for('download.download_file', filename=os.path.basename(job.result))
+    return status
+
 @process_bp.route('/process/<filename>', methods=['GET', 'POST'])
 def process_file(filename):
     try:
+        if not os.path.exists(os.path.join(Config.UPLOAD_FOLDER, filename)):
+            if wants_json():
+                return jsonify({'error': f'File not found: {filename}'}), 404
+            flash('File not found')
+            return redirect(url_for('upload.upload'))
+        
+        storage_manager.touch(os.path.join(Config.UPLOAD_FOLDER, filename))
+        
         # Handle custom classifications if provided
         custom_classifications = {}
         if request.method == 'POST':
@@ -22,56 +48,46 @@ def process_file(filename):
                 except json.JSONDecodeError:
                     custom_classifications = {}
         
-        # Process CSV with custom classifications
-        processor = CSVProcessor()
+        pipeline = ReportPipeline()
         
-        # Add custom classifications to processor and save to CSV if provided
+        # Add custom classifications and save to CSV before the job is queued
         if custom_classifications:
-            processor.wagon_classifier.add_custom_classifications(custom_classifications)
+            pipeline.add_custom_classifications(custom_classifications)
             flash(f'Added {len(custom_classifications)} custom classifications and saved to CSV file')
         
-        processed_df = processor.process_csv(filename)
-        
-        # Generate intermediate XLSX
-        xlsx_generator = XLSXGenerator()
-        xlsx_filename = xlsx_generator.generate_intermediate_xlsx(processed_df, filename)
-        
-        # Check if intermediate file was created successfully
-        if not os.path.exists(xlsx_filename):
-            flash(f'Error: Intermediate file {xlsx_filename} was not created')
-            return redirect(url_for('upload.upload'))
-        
-        # Generate final report
-        final_report_generator = FinalReportGenerator()
-        
-        # Read the intermediate XLSX file with full path
-        try:
-            intermediate_df = pd.read_excel(xlsx_filename)
-        except FileNotFoundError:
-            flash(f'Error: Cannot find intermediate file: {xlsx_filename}')
-            return redirect(url_for('upload.upload'))
+        # A report already generated from the same upload and reference data is reused
+        cached_report = pipeline.cached_report(filename)
+        if cached_report:
+            download_url = url_for('download.download_file', filename=os.path.basename(cached_report))
+            if wants_json():
+                return jsonify({'state': SUCCEEDED, 'cached': True, 'download_url': download_url})
+            return redirect(download_url)
         
-        # Process the data to get handedover and takenover data
-        report_processor = ReportDataProcessor()
-        handedover_data = report_processor.process_handedover_data(intermediate_df)
-        takenover_data = report_processor.process_takenover_data(intermediate_df)
-        
-        # Generate final report with all required arguments
-        final_report_filename, message = final_report_generator.generate_final_report(
-            handedover_data, 
-            takenover_data, 
-            filename  # original filename
+        # The report is generated by a background worker, the page polls for it
+        # The job reuses the upload hash of the cache lookup instead of reading the file again
+        job = job_queue.submit(
+            generate_report, filename, description=filename, discard=ReportPipeline.discard_report,
+            upload_digest=pipeline.upload_digests.get(filename)
         )
         
-        # Check if generation was successful
-        if final_report_filename:
-            # CORRECT - extract just the filename
-            just_filename = os.path.basename(final_report_filename)
-            return redirect(url_for('download.download_file', filename=just_filename))
-        else:
-            flash(f'Error generating final report: {message}')
-            return redirect(url_for('upload.upload'))
+        if wants_json():
+            return jsonify(job_status(job)), 202
+        return render_template('process.html', filename=filename, job=job_status(job))
         
     except Exception as e:
         flash(f'Error processing file: {str(e)}')
         return redirect(url_for('upload.upload'))
+
+@process_bp.route('/jobs/<job_id>')
+def job_status_view(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown or expired job'}), 404
+    return jsonify(job_status(job))
+
+@process_bp.route('/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    job = job_queue.cancel(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown or expired job'}), 404
+    return jsonify(job_status(job))
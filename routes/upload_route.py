@@ -3,6 +3,7 @@ import os
 import json
 from werkzeug.utils import secure_filename
 from config import Config
+from services.artifact_index import artifact_index
 
 upload_bp = Blueprint('upload', __name__)
 
@@ -26,6 +27,7 @@ def upload():
             filename = secure_filename(file.filename)
             filepath = os.path.join(Config.UPLOAD_FOLDER, filename)
             file.save(filepath)
+            artifact_index.register(filepath)
             flash('File uploaded successfully!')
             
             # Redirect to classification management page
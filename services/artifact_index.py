@@ -0,0 +1,99 @@
+import hashlib
+import os
+import threading
+from config import Config
+
+class Artifact:
+    """A downloadable file with the stat its content hash was computed for"""
+
+    __slots__ = ('name', 'path', 'size', 'mtime_ns', 'sha256')
+
+    def __init__(self, name, path):
+        self.name = name
+        self.path = path
+        self.size = None
+        self.mtime_ns = None
+        self.sha256 = None
+
+    @property
+    def etag(self):
+        return self.sha256
+
+class ArtifactIndex:
+    """Download name -> file path, size and content hash, kept up to date by the generators
+
+    Lookups are a dict hit plus one stat to notice a replaced file. Hashes are
+    computed on the first download after a change, not when the file is written.
+    Files written by other worker processes are found through the download
+    name's folder and added on first use.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._artifacts = {}
+
+    @staticmethod
+    def folder_for(name):
+        """Folder a download name is written to, by its suffix"""
+        if name.endswith('_final_report.xlsx') or name.endswith('.zip'):
+            return Config.REPORTS_FOLDER
+        if name.endswith('_processed.xlsx'):
+            return Config.INTERMEDIATE_FOLDER
+        return Config.UPLOAD_FOLDER
+
+    def register(self, path):
+        """Record a file a generator has just written, returns its download name"""
+        name = os.path.basename(path)
+        with self._lock:
+            self._artifacts[name] = Artifact(name, os.path.abspath(path))
+        return name
+
+    def forget(self, path):
+        with self._lock:
+            self._artifacts.pop(os.path.basename(path), None)
+
+    def resolve(self, name):
+        """Artifact of a download name with a current size and hash, None if there is no such file"""
+        # Names are single path components, as generated
+        if not name or name != os.path.basename(name) or name in ('.', '..'):
+            return None
+
+        with self._lock:
+            artifact = self._artifacts.get(name)
+        if artifact is None:
+            artifact = Artifact(name, os.path.join(self.folder_for(name), name))
+
+        try:
+            stat = os.stat(artifact.path)
+        except OSError:
+            self.forget(name)
+            return None
+        if not os.path.isfile(artifact.path):
+            return None
+
+        if (stat.st_size, stat.st_mtime_ns) != (artifact.size, artifact.mtime_ns):
+            artifact = self._hash(artifact, stat)
+            with self._lock:
+                self._artifacts[name] = artifact
+        return artifact
+
+    @staticmethod
+    def _hash(artifact, stat):
+        """A fresh Artifact with the file's current stat and content hash"""
+        digest = hashlib.sha256()
+        with open(artifact.path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+
+        refreshed = Artifact(artifact.name, artifact.path)
+        refreshed.size = stat.st_size
+        refreshed.mtime_ns = stat.st_mtime_ns
+        refreshed.sha256 = digest.hexdigest()
+        return refreshed
+
+    def stats(self):
+        with self._lock:
+            return {'artifacts': len(self._artifacts)}
+
+# One index per worker process
+artifact_index = ArtifactIndex()
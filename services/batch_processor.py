@@ -0,0 +1,88 @@
+import csv
+import io
+import multiprocessing
+import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from config import Config
+from services.artifact_index import artifact_index
+
+def _generate_report(filename):
+    """Worker body: run one uploaded CSV through the report pipeline"""
+    from services.report_pipeline import ReportPipeline
+
+    try:
+        report_path, message = ReportPipeline().run(filename)
+    except Exception as e:
+        report_path, message = None, f"Error processing file: {str(e)}"
+    return filename, report_path, message
+
+class BatchProcessor:
+    """Generate final reports for many uploads in parallel and zip them together"""
+
+    SUMMARY_NAME = 'batch_summary.csv'
+
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers or Config.BATCH_WORKERS or os.cpu_count() or 1
+
+    def process(self, filenames):
+        """Run every file, returns [(filename, report_path or None, message)] in input order"""
+        if not filenames:
+            return []
+
+        workers = min(self.max_workers, len(filenames))
+        if workers == 1:
+            return [_generate_report(filename) for filename in filenames]
+
+        # Spawned workers don't inherit the web server's threads and locks
+        context = multiprocessing.get_context('spawn')
+        results = {}
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+            futures = {filename: executor.submit(_generate_report, filename) for filename in filenames}
+            for filename, future in futures.items():
+                try:
+                    results[filename] = future.result()
+                except Exception as e:
+                    # A worker that died only fails its own file
+                    results[filename] = (filename, None, f"Error processing file: {str(e)}")
+
+        return [results[filename] for filename in filenames]
+
+    def write_zip(self, results, zip_path=None):
+        """Zip the generated reports with a summary of every file's outcome"""
+        if zip_path is None:
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            zip_path = os.path.join(Config.REPORTS_FOLDER, f"batch_{timestamp}.zip")
+        os.makedirs(os.path.dirname(zip_path), exist_ok=True)
+
+        summary = io.StringIO()
+        writer = csv.writer(summary)
+        writer.writerow(['FILE', 'STATUS', 'REPORT', 'MESSAGE'])
+
+        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as archive:
+            for filename, report_path, message in results:
+                if report_path and os.path.exists(report_path):
+                    report_name = os.path.basename(report_path)
+                    archive.write(report_path, report_name)
+                    writer.writerow([filename, 'OK', report_name, message])
+                else:
+                    writer.writerow([filename, 'FAILED', '', message])
+            archive.writestr(self.SUMMARY_NAME, summary.getvalue())
+
+        artifact_index.register(zip_path)
+        return zip_path
+
+    @staticmethod
+    def discard_zip(zip_path):
+        """Remove the zip of a batch that was cancelled while it was written"""
+        artifact_index.forget(zip_path)
+        try:
+            os.remove(zip_path)
+        except FileNotFoundError:
+            pass
+
+    def run(self, filenames):
+        """Process files and return (zip_path, results)"""
+        results = self.process(filenames)
+        return self.write_zip(results), results
@@ -0,0 +1,60 @@
+from copy import copy
+from openpyxl import Workbook
+from openpyxl.cell.cell import Cell, MergedCell
+from openpyxl.utils import get_column_letter
+from openpyxl.worksheet.cell_range import CellRange, MultiCellRange
+from .report_formatter import ReportFormatter
+
+class BulkReportRenderer:
+    """Write a ReportLayout with openpyxl, creating every cell once with its final style
+
+    Cells are built from integer rows and columns with the style table entry
+    of their style id, nothing is looked up by address or restyled later.
+    Cells covered by a merge other than the top-left one become MergedCells
+    with the area's style, so merged ranges are only registered, not applied.
+    """
+
+    def __init__(self, formatter=None):
+        self.formatter = formatter or ReportFormatter()
+
+    def render(self, layout, output_path, sheet_name):
+        wb = Workbook()
+        ws = wb.active
+        ws.title = sheet_name
+
+        # Planned merges never overlap, so they are registered in one go rather than
+        # through merged_cells.add(), which compares each new range with every other
+        covered = set()
+        ws.merged_cells = MultiCellRange([
+            CellRange(min_col=first_col, min_row=first_row, max_col=last_col, max_row=last_row)
+            for first_row, first_col, last_row, last_col in layout.merges
+        ])
+        for first_row, first_col, last_row, last_col in layout.merges:
+            for row in range(first_row, last_row + 1):
+                for column in range(first_col, last_col + 1):
+                    covered.add((row, column))
+            covered.discard((first_row, first_col))
+
+        style_arrays = {}
+        sheet_cells = ws._cells
+        for row, cells in layout.iter_rows():
+            for column, value, style in cells:
+                style_array = style_arrays.get(style)
+                if style_array is None and style is not None:
+                    style_array = style_arrays[style] = self.formatter.style_array(wb, style)
+
+                if (row, column) in covered:
+                    cell = MergedCell(ws, row=row, column=column)
+                    if style_array is not None:
+                        cell._style = copy(style_array)
+                else:
+                    cell = Cell(ws, row=row, column=column, value=value, style_array=style_array)
+                sheet_cells[(row, column)] = cell
+
+        for column, width in layout.column_widths.items():
+            ws.column_dimensions[get_column_letter(column)].width = width
+        for row, height in layout.row_heights.items():
+            ws.row_dimensions[row].height = height
+
+        wb.save(output_path)
+        return output_path
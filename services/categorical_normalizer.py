@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+from services.reference_data import reference_data
+
+def map_distinct(series, func, missing):
+    """Evaluate func once per distinct value of a Series and broadcast it to every row
+
+    func gets an object Index of the distinct values, missing values get `missing`.
+    On a categorical Series this works on the integer codes.
+    """
+    codes, uniques = pd.factorize(series)
+    values = np.asarray(func(pd.Index(np.asarray(uniques, dtype=object), dtype=object)))
+    return np.append(values, missing)[codes]
+
+class CategoricalNormalizer:
+    """Strip, upper-case and intern text columns into categorical dtypes shared per domain"""
+
+    # All columns of a domain share one dtype, so their codes are comparable
+    COLUMN_DOMAINS = {
+        'zone': ['ZONE TO', 'TAKEN OVER ZONE FROM', 'HANDED OVER ZONE TO'],
+        'station': ['IC STTN', 'TAKEN OVER STTN TO', 'HANDED OVER STTN TO'],
+        'le': ['TAKEN OVER L/E', 'HANDED OVER L/E'],
+        'wagon_type': ['TAKEN OVER TYPE', 'HANDED OVER TYPE'],
+        'loco_type': ['TAKEN OVER LOCO TYPE', 'HANDED OVER LOCO TYPE'],
+        'classification': ['TAKENOVER CLASSIFICATION', 'HANDEDOVER CLASSIFICATION']
+    }
+
+    def normalize(self, df, domains=None):
+        """Convert the domain columns present in df in place and return df"""
+        for domain in domains or self.COLUMN_DOMAINS:
+            columns = [column for column in self.COLUMN_DOMAINS[domain] if column in df.columns]
+            if not columns:
+                continue
+
+            cleaned = {column: self._clean(df[column]) for column in columns}
+            observed = set()
+            for _, values in cleaned.values():
+                observed.update(values.dropna())
+
+            dtype = self.dtype(domain, observed)
+            for column, (codes, values) in cleaned.items():
+                # Missing values (code -1) pick the trailing -1
+                positions = np.append(dtype.categories.get_indexer(values), -1)
+                df[column] = pd.Categorical.from_codes(positions[codes], dtype=dtype)
+
+        return df
+
+    @staticmethod
+    def _clean(series):
+        """(codes, cleaned distinct values): stripped, upper-cased, blanks missing"""
+        codes, uniques = pd.factorize(series)
+        values = pd.Index(np.asarray(uniques, dtype=object), dtype=object).astype(str).str.strip().str.upper()
+        values = values.where(values != '', np.nan)
+        return codes, values
+
+    @staticmethod
+    def dtype(domain, observed=()):
+        """Reference values of the domain first, then any other observed values"""
+        known = [str(value).strip().upper() for value in reference_data.categories(domain)]
+        known = list(dict.fromkeys(value for value in known if value))
+        extra = sorted(set(observed).difference(known))
+        return pd.CategoricalDtype(known + extra)
@@ -1,9 +1,34 @@
+import logging
+import re
+import numpy as np
 import pandas as pd
 import os
+from datetime import datetime
 from config import Config
 from services.wagon_classifier import WagonClassifier
+from services.categorical_normalizer import CategoricalNormalizer, map_distinct
+from services.metrics import metrics
+from services.parse_cache import parse_cache
+from services.reference_data import reference_data
+
+try:
+    import pyarrow  # noqa: F401
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+logger = logging.getLogger(__name__)
+
+class MissingColumnsError(Exception):
+    """The upload's header row lacks required columns"""
 
 class CSVProcessor:
+    # Header row of the export (rows 1-2 are a title and a summary line)
+    HEADER_ROW = 2
+    
+    # Loco numbers keep pandas' numeric inference, everything else is text
+    NUMERIC_COLUMNS = ['TAKEN OVER LOCO', 'HANDED OVER LOCO']
+    
     def __init__(self):
         self.required_columns = [
             'ZONE TO', 'IC STTN', 'TAKEN OVER ZONE FROM','TAKEN OVER STTN TO', 'TAKEN OVER L/E',
@@ -11,190 +36,231 @@ class CSVProcessor:
             'HANDED OVER ZONE TO', 'HANDED OVER STTN TO', 'HANDED OVER L/E',
             'HANDED OVER TYPE', 'HANDED OVER LOCO', 'HANDED OVER LOCO TYPE'
         ]
+        self.column_dtypes = {col: str for col in self.required_columns if col not in self.NUMERIC_COLUMNS}
         
-        # Station ordering for grouping - FIXED: DFC matches DFCR
-        self.zone_order = ['CR', 'WC', 'NW', 'DFCR']  # Changed DFC to DFCR
-        self.station_order = {
-            'CR': ['BSR', 'JL', 'KNW'],
-            'WC': ['SHRN', 'NAD', 'MKC', 'MTA', 'CNA'],
-            'NW': ['BEC', 'AII', 'HMT', 'BLDI', 'PNU'],
-            'DFCR': ['BHU', 'CECC', 'GGM', 'MSH', 'SAUN', 'SAUS', 'MPR', 'GTX', 'PAO', 'NOL', 'BHET', 'SAH', 'SJN']
-        }
+        # Zone and station order for grouping, from data/station_topology.csv
+        self.topology = reference_data.station_topology
         
-        # Zones that convert SAU to SAUS
-        self.saus_zones = ['WR', 'CR', 'KR', 'SW', 'SR', 'SEC', 'ECO','SC',]
+        # CNA -> AII and SAU -> SAUS/SAUN conversions, from data/station_rules.csv
+        self.station_rules = reference_data.station_rules
         
         # Initialize wagon classifier
         self.wagon_classifier = WagonClassifier()
+        
+        # Zone, station and wagon type columns become shared categoricals
+        self.normalizer = CategoricalNormalizer()
     
-    def process_csv(self, filename):
+    def process_csv(self, filename, digest=None):
         """Extract specific columns from row 3 onwards and group by ZONE TO and IC STTN"""
         try:
-            file_path = os.path.join(Config.UPLOAD_FOLDER, filename)
-            
-            # Read CSV starting from row 3 (index 2)
-            df = pd.read_csv(file_path, skiprows=2)
-            
-            # Extract only required columns
-            missing_columns = [col for col in self.required_columns if col not in df.columns]
-            if missing_columns:
-                raise ValueError(f"Missing columns: {missing_columns}")
-            
-            extracted_df = df[self.required_columns].copy()
-            
-            # Remove rows with NaN in ZONE TO or IC STTN
-            extracted_df = extracted_df.dropna(subset=['ZONE TO', 'IC STTN'])
-            
-            # Add classification columns
-            extracted_df = self._add_classification_columns(extracted_df)
-            
-            # Convert CNA of NW zone to AII
-            extracted_df = self._convert_nw_cna_to_aii(extracted_df)
-            
-            # Convert SAU in IC STTN based on TAKEN OVER ZONE FROM (for taken over section only)
-            extracted_df = self._convert_sau_in_taken_over_section(extracted_df)
+            extracted_df = self.read_required_columns(filename, digest)
             
-            # Create IC STTN (Copy) for handedover section
-            extracted_df = self._create_ic_sttn_copy(extracted_df)
+            # Classify and convert stations
+            extracted_df = self._transform(extracted_df)
             
             # Group and sort data
             grouped_df = self._group_and_sort(extracted_df)
             
             return grouped_df
             
+        except MissingColumnsError:
+            raise
         except Exception as e:
             raise Exception(f"Error processing CSV: {str(e)}")
     
-    def _add_classification_columns(self, df):
-        """Add TAKENOVER CLASSIFICATION and HANDEDOVER CLASSIFICATION columns"""
-        # Add TAKENOVER CLASSIFICATION based on TAKEN OVER TYPE
-        df['TAKENOVER CLASSIFICATION'] = df['TAKEN OVER TYPE'].apply(self.wagon_classifier.classify_wagon)
+    def iter_processed_chunks(self, filename, chunksize):
+        """Stream an upload in chunks of rows without loading the whole file
         
-        # Add HANDEDOVER CLASSIFICATION based on HANDED OVER TYPE
-        df['HANDEDOVER CLASSIFICATION'] = df['HANDED OVER TYPE'].apply(self.wagon_classifier.classify_wagon)
+        Yields (processed_chunk, sort_keys) per chunk. Chunks are not sorted,
+        sort_keys holds each row's position in the sorted upload.
+        """
+        try:
+            file_path = os.path.join(Config.UPLOAD_FOLDER, filename)
+            self._check_header(file_path)
+            
+            # pyarrow can't read in chunks, so streaming always uses the C parser
+            reader = pd.read_csv(
+                file_path,
+                header=self.HEADER_ROW,
+                usecols=self.required_columns,
+                dtype=self.column_dtypes,
+                chunksize=chunksize
+            )
+            
+            with reader:
+                while True:
+                    with metrics.span('parse', rows=0) as span:
+                        chunk = next(reader, None)
+                        if chunk is None:
+                            break
+                        chunk = self.normalizer.normalize(chunk[self.required_columns].copy())
+                        chunk = chunk.dropna(subset=['ZONE TO', 'IC STTN'])
+                        span.rows = len(chunk)
+                    if chunk.empty:
+                        continue
+                    
+                    processed = self._transform(chunk)
+                    with metrics.span('sort', rows=len(processed)):
+                        sort_keys = self._sort_keys(processed)
+                        # The reader's index is the row's position in the whole file
+                        sort_keys['position'] = processed.index.to_numpy()
+                    
+                    yield processed, sort_keys
+            
+        except MissingColumnsError:
+            raise
+        except Exception as e:
+            raise Exception(f"Error processing CSV: {str(e)}")
+    
+    def _transform(self, extracted_df):
+        """Classification columns and station conversions, independent for every row"""
+        # Add classification columns
+        with metrics.span('classify', rows=len(extracted_df)):
+            extracted_df = self._add_classification_columns(extracted_df)
         
-        return df
+        with metrics.span('convert', rows=len(extracted_df)):
+            # IC STTN for the taken over section and IC STTN (Copy) for the
+            # handed over section, both from the original IC STTN
+            ic_sttn, ic_sttn_copy = self.station_rules.apply(extracted_df)
+            extracted_df['IC STTN'] = ic_sttn
+            extracted_df['IC STTN (Copy)'] = ic_sttn_copy
+            return extracted_df
     
-    def _convert_nw_cna_to_aii(self, df):
-        """Convert CNA to AII only for NW zone"""
-        mask = (df['ZONE TO'] == 'NW') & (df['IC STTN'] == 'CNA')
-        df.loc[mask, 'IC STTN'] = 'AII'
+    def read_required_columns(self, filename, digest=None):
+        """Return the required columns of an upload, parsing each file content only once"""
+        file_path = os.path.join(Config.UPLOAD_FOLDER, filename)
+        with metrics.span('parse') as span:
+            df = parse_cache.get_or_parse(file_path, self.required_columns, self._parse_required_columns, digest)
+            span.rows = len(df)
         return df
     
-    def _convert_sau_in_taken_over_section(self, df):
-        """Convert SAU in IC STTN based on TAKEN OVER ZONE FROM"""
-        # Rule: IC STTN = SAU, check TAKEN OVER ZONE FROM
-        mask = df['IC STTN'] == 'SAU'
-        saus_mask = mask & df['TAKEN OVER ZONE FROM'].isin(self.saus_zones)
-        saun_mask = mask & ~df['TAKEN OVER ZONE FROM'].isin(self.saus_zones)
+    def _parse_required_columns(self, file_path):
+        """Read only the required columns from row 3 onwards, keep rows with ZONE TO and IC STTN"""
+        # Check the header before reading the body so a wrong export fails fast
+        self._check_header(file_path)
         
-        df.loc[saun_mask, 'IC STTN'] = 'SAUN'
-        df.loc[saus_mask, 'IC STTN'] = 'SAUS'
+        # Columns outside the projection are never converted or stored. The header
+        # row is given as header= since the pyarrow engine ignores skiprows
+        engine = self._csv_engine()
+        logger.debug("Parsing %s with the %s engine", os.path.basename(file_path), engine)
+        df = pd.read_csv(
+            file_path,
+            header=self.HEADER_ROW,
+            usecols=self.required_columns,
+            dtype=self.column_dtypes,
+            engine=engine
+        )
         
-        return df
+        # pyarrow keeps empty text cells as '', the C parser reads them as NaN
+        if engine == 'pyarrow':
+            text_columns = list(self.column_dtypes)
+            df[text_columns] = df[text_columns].replace('', np.nan)
+        
+        # usecols keeps the file's column order
+        extracted_df = self.normalizer.normalize(df[self.required_columns].copy())
+        
+        # Remove rows with NaN in ZONE TO or IC STTN
+        return extracted_df.dropna(subset=['ZONE TO', 'IC STTN'])
     
-    def _create_ic_sttn_copy(self, df):
-        """Create IC STTN (Copy) for handedover section with different logic"""
-        # Start with original IC STTN before any conversions (except CNA->AII)
-        df['IC STTN (Copy)'] = df['IC STTN'].copy()
-        
-        # Handle CNA conversion for IC STTN (Copy) as well
-        mask_cna = (df['ZONE TO'] == 'NW') & (df['IC STTN (Copy)'] == 'CNA')
-        df.loc[mask_cna, 'IC STTN (Copy)'] = 'AII'
-        
-        # For handedover section, we need to start from original SAU values
-        # Reset any SAU conversions that might have been applied
-        mask_sau_reset = (df['IC STTN (Copy)'].isin(['SAUS', 'SAUN']))
-        # Find original SAU entries by checking if they were converted
-        original_sau_mask = mask_sau_reset
-        df.loc[original_sau_mask, 'IC STTN (Copy)'] = 'SAU'
-        
-        # Now apply SAU conversion for IC STTN (Copy) using HANDED OVER ZONE TO
-        mask = df['IC STTN (Copy)'] == 'SAU'
-        
-        # Use HANDED OVER ZONE TO for handedover section conversion
-        if 'HANDED OVER ZONE TO' in df.columns:
-            saus_mask = mask & df['HANDED OVER ZONE TO'].isin(self.saus_zones)
-            saun_mask = mask & ~df['HANDED OVER ZONE TO'].isin(self.saus_zones)
-        else:
-            # Fallback logic - default to SAUN first (priority)
-            saun_mask = mask  
-            saus_mask = pd.Series([False] * len(df))
-        
-        # Apply conversions with SAUN having priority
-        df.loc[saun_mask, 'IC STTN (Copy)'] = 'SAUN'
-        df.loc[saus_mask, 'IC STTN (Copy)'] = 'SAUS'
+    def read_report_period(self, filename):
+        """{'zone', 'date_from', 'date_to'} from the export's summary line, None if it has none"""
+        file_path = os.path.join(Config.UPLOAD_FOLDER, filename)
+        with open(file_path, encoding='utf-8', errors='replace') as f:
+            preamble = ' '.join(f.readline() for _ in range(self.HEADER_ROW))
         
-        return df
+        # e.g. "[  Zone: WR,  DateFrom: 22-06-2025,  DateTo: 22-06-2025,  Gauge: BG,; ..."
+        zone = re.search(r'Zone:\s*([A-Za-z0-9]+)', preamble)
+        date_from = re.search(r'DateFrom:\s*(\d{2}-\d{2}-\d{4})', preamble)
+        if not zone or not date_from:
+            return None
+        date_to = re.search(r'DateTo:\s*(\d{2}-\d{2}-\d{4})', preamble)
+        
+        try:
+            date_from = datetime.strptime(date_from.group(1), '%d-%m-%Y').date()
+            date_to = datetime.strptime(date_to.group(1), '%d-%m-%Y').date() if date_to else date_from
+        except ValueError:
+            return None
+        return {'zone': zone.group(1).upper(), 'date_from': date_from, 'date_to': date_to}
     
-    def _convert_sau_in_handed_over_section(self, df):
-        """Convert SAU in IC STTN (Copy) based on HANDED OVER ZONE TO"""
-        if 'IC STTN (Copy)' in df.columns and 'HANDED OVER ZONE TO' in df.columns:
-            mask = df['IC STTN (Copy)'] == 'SAU'
-            
-            # Debug prints
-            print(f"SAU rows found: {mask.sum()}")
-            print(f"HANDED OVER ZONE TO values: {df.loc[mask, 'HANDED OVER ZONE TO'].unique()}")
-            print(f"SAUS zones configured: {self.saus_zones}")
-            
-            saus_mask = mask & df['HANDED OVER ZONE TO'].isin(self.saus_zones)
-            saun_mask = mask & ~df['HANDED OVER ZONE TO'].isin(self.saus_zones)
-            
-            print(f"SAUS conversions: {saus_mask.sum()}")
-            print(f"SAUN conversions: {saun_mask.sum()}")
+    def _check_header(self, file_path):
+        """Raise if the header row lacks a required column"""
+        header = pd.read_csv(file_path, header=self.HEADER_ROW, nrows=0).columns
+        missing_columns = [col for col in self.required_columns if col not in header]
+        if missing_columns:
+            logger.warning("%s lacks required columns: %s", os.path.basename(file_path), missing_columns)
+            raise MissingColumnsError(f"Missing columns: {missing_columns}")
+    
+    @staticmethod
+    def _csv_engine():
+        """CSV_ENGINE setting, 'auto' uses pyarrow when it is installed"""
+        engine = Config.CSV_ENGINE
+        if engine == 'auto':
+            return 'pyarrow' if HAS_PYARROW else 'c'
+        return engine
+    
+    def _add_classification_columns(self, df):
+        """Add TAKENOVER CLASSIFICATION and HANDEDOVER CLASSIFICATION columns"""
+        # Add TAKENOVER CLASSIFICATION based on TAKEN OVER TYPE
+        df['TAKENOVER CLASSIFICATION'] = self.wagon_classifier.classify_series(df['TAKEN OVER TYPE'])
+        
+        # Add HANDEDOVER CLASSIFICATION based on HANDED OVER TYPE
+        df['HANDEDOVER CLASSIFICATION'] = self.wagon_classifier.classify_series(df['HANDED OVER TYPE'])
+        
+        # Unclassified ('') wagons become missing, as in the intermediate frame
+        return self.normalizer.normalize(df, ['classification'])
+    
+    def reclassify(self, df, wagon_types):
+        """Reclassify in place only the rows of df whose wagon type is in wagon_types
+        
+        Returns {classification column: mask of the reclassified rows}.
+        """
+        masks = {}
+        with metrics.span('classify', rows=0) as span:
+            for type_column, classification_column in [
+                ('TAKEN OVER TYPE', 'TAKENOVER CLASSIFICATION'),
+                ('HANDED OVER TYPE', 'HANDEDOVER CLASSIFICATION')
+            ]:
+                mask = df[type_column].isin(list(wagon_types)).to_numpy()
+                masks[classification_column] = mask
+                if not mask.any():
+                    continue
+                
+                # Unclassified ('') wagons are missing, as in _add_classification_columns
+                classified = self.wagon_classifier.classify_series(df.loc[mask, type_column]).replace('', np.nan)
+                column = df[classification_column]
+                column = column.cat.add_categories(
+                    pd.Index(classified.dropna().unique()).difference(column.cat.categories)
+                )
+                column[mask] = classified.to_numpy()
+                df[classification_column] = column
+                span.rows += int(mask.sum())
             
-            df.loc[saus_mask, 'IC STTN (Copy)'] = 'SAUS'
-            df.loc[saun_mask, 'IC STTN (Copy)'] = 'SAUN'
+            # Back to the shared classification dtype
+            self.normalizer.normalize(df, ['classification'])
         
-        return df
+        return masks
     
-    def _group_and_sort(self, df):
-        """Group by ZONE TO first, then sort IC STTN within each zone for both columns"""
+    def _sort_keys(self, df):
+        """Zone, IC STTN and IC STTN (Copy) priorities of every row"""
+        # Unknown zones sort after all ordered zones
+        unknown_zone = len(self.topology.zone_order)
+        zone_priority = map_distinct(
+            df['ZONE TO'], lambda zones: [self.topology.zone_rank(zone) for zone in zones], unknown_zone
+        ).astype(np.int64)
         
-        def get_zone_priority(zone):
-            if zone in self.zone_order:
-                return self.zone_order.index(zone)
-            else:
-                return len(self.zone_order)
-        
-        def get_station_priority(zone, station):
-            if zone in self.station_order and station in self.station_order[zone]:
-                return self.station_order[zone].index(station)
-            else:
-                return 1000
-        
-        # Add zone priority
-        df['zone_priority'] = df['ZONE TO'].apply(get_zone_priority)
-        
-        # Create combined sorting key for BOTH IC STTN and IC STTN (Copy)
-        df['combined_priority'] = df.apply(lambda row: (
-            get_station_priority(row['ZONE TO'], row['IC STTN']),
-            get_station_priority(row['ZONE TO'], row['IC STTN (Copy)'])
-        ), axis=1)
-        
-        # Sort by zone first, then by combined priority
-        sorted_df = df.sort_values([
-            'zone_priority',
-            'combined_priority'
-        ]).drop(['zone_priority', 'combined_priority'], axis=1)
-        
-        return sorted_df
+        # Sort keys for BOTH IC STTN and IC STTN (Copy)
+        return pd.DataFrame({
+            'zone_priority': zone_priority,
+            'station_priority': self.topology.station_ranks(df['ZONE TO'], df['IC STTN']),
+            'copy_priority': self.topology.station_ranks(df['ZONE TO'], df['IC STTN (Copy)'])
+        })
     
-    def get_original_ic_sttn(self, filename):
-        """Get original IC STTN column before any conversion for handed over section"""
-        try:
-            file_path = os.path.join(Config.UPLOAD_FOLDER, filename)
-            df = pd.read_csv(file_path, skiprows=2)
-            extracted_df = df[self.required_columns].copy()
-            extracted_df = extracted_df.dropna(subset=['ZONE TO', 'IC STTN'])
-            
-            # Add classification columns before any conversions
-            extracted_df = self._add_classification_columns(extracted_df)
-            
-            # Only convert CNA to AII, don't convert SAU yet
-            extracted_df = self._convert_nw_cna_to_aii(extracted_df)
+    def _group_and_sort(self, df):
+        """Group by ZONE TO first, then sort IC STTN within each zone for both columns"""
+        with metrics.span('sort', rows=len(df)):
+            sort_keys = self._sort_keys(df)
             
-            return extracted_df['IC STTN']
+            # Stable sort by zone first, then by station priorities
+            order = sort_keys.sort_values(['zone_priority', 'station_priority', 'copy_priority'], kind='stable').index
             
-        except Exception as e:
-            raise Exception(f"Error getting original IC STTN: {str(e)}")
\ No newline at end of file
+            return df.iloc[order.to_numpy()]
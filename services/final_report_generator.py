@@ -1,287 +1,76 @@
-import pandas as pd
 import os
 from config import Config
 from .report_formatter import ReportFormatter
+from .artifact_index import artifact_index
+from .metrics import metrics
+from .reference_data import reference_data
 from .report_data_processor import ReportDataProcessor
-from openpyxl import Workbook
+from .report_layout import ReportLayoutPlanner
+from .bulk_report_renderer import BulkReportRenderer
+from .streaming_report_renderer import StreamingReportRenderer
 
 class FinalReportGenerator:
-    def __init__(self):
+    SHEET_TITLE = "Zonal Interchange Report"
+    RENDERERS = ('openpyxl', 'xlsxwriter')
+    
+    # Bump whenever the report content or layout changes, cached reports are keyed on it
+    VERSION = 1
+    
+    def __init__(self, renderer=None):
         self.formatter = ReportFormatter()
         self.data_processor = ReportDataProcessor()
+        
+        # Both render the same precomputed layout: openpyxl builds the workbook in memory, xlsxwriter streams it
+        self.renderer = renderer or Config.REPORT_RENDERER
+        if self.renderer not in self.RENDERERS:
+            raise ValueError(f"Unknown report renderer: {self.renderer}")
+    
+    def cache_version(self):
+        """Everything besides the input data that decides the report's content"""
+        # The title is dated, so a report cached yesterday is not reused today
+        return f"{self.VERSION}:{self.renderer}:{self.formatter.report_title()}"
+    
+    @staticmethod
+    def order_stations(stations):
+        """Report order of stations from the station topology, unknown stations last"""
+        return reference_data.station_topology.order(stations)
     
     def generate_final_report(self, handedover_data, takenover_data, original_filename):
         """Generate final report from processed intermediate data"""
         try:
-            wb = Workbook()
-            ws = wb.active
-            ws.title = "Zonal Interchange Report"
-            
-            # Create report structure
-            self.formatter.create_report_structure(ws)
+            processor = self.data_processor
             
-            # Get stations in order
-            processor = ReportDataProcessor()
-            intermediate_file = self._get_intermediate_file_path(original_filename)
-            df = pd.read_excel(intermediate_file)
-            handedover_stations, takenover_stations = processor.get_stations_in_order(df)
+            # Station lists in report order
+            handedover_stations = self.order_stations(handedover_data.keys())
+            takenover_stations = self.order_stations(takenover_data.keys())
             
-            # Get station lists
-            handedover_stations = list(handedover_data.keys())
-            takenover_stations = list(takenover_data.keys())
-            
-            # Complete fix: Maintain all zone ordering while ensuring SAUN before SAUS
-            def maintain_zone_ordering(stations):
-                # Zone order
-                zone_order = ['CR', 'WC', 'NW', 'DFCR']
-                
-                # Stations within each zone (with SAUN before SAUS in DFCR)
-                zone_stations = {
-                    'CR': ['BSR', 'JL', 'KNW'],
-                    'WC': ['SHRN', 'NAD', 'MKC', 'MTA', 'CNA'],
-                    'NW': ['BEC', 'AII', 'HMT', 'BLDI', 'PNU'],
-                    'DFCR': ['BHU', 'CECC', 'GGM', 'MSH', 'SAUN', 'SAUS', 'MPR', 'GTX', 'PAO', 'NOL', 'BHET', 'SAH', 'SJN']
-                }
-                
-                # Flatten all expected stations in order
-                all_ordered_stations = []
-                for zone in zone_order:
-                    all_ordered_stations.extend(zone_stations[zone])
-                
-                # Order actual stations based on expected order
-                ordered_stations = []
-                for station in all_ordered_stations:
-                    if station in stations:
-                        ordered_stations.append(station)
-                
-                # Add any stations not in our ordering at the end
-                for station in stations:
-                    if station not in ordered_stations:
-                        ordered_stations.append(station)
-                
-                return ordered_stations
-            
-            # Fix station order
-            handedover_stations = maintain_zone_ordering(handedover_stations)
-            takenover_stations = maintain_zone_ordering(takenover_stations)
-            
-            # Populate data starting from row 5
-            last_data_row = self._populate_report_data(ws, handedover_data, takenover_data, handedover_stations, takenover_stations)
-            
-            # Calculate and add totals ONLY at the end (not in the loop)
-            totals_handed = processor.calculate_totals(handedover_data, handedover_stations, is_handedover=True)
-            totals_taken = processor.calculate_totals(takenover_data, takenover_stations, is_handedover=False)
+            output_filename = self._generate_output_filename(original_filename)
             
-            # Add GRAND TOTAL row (remove SUBTOTAL for now)
-            grand_total_row = last_data_row + 1
-            self._add_total_row(ws, grand_total_row, totals_handed, totals_taken, "GRAND TOTAL")
+            # Report rows are one per station
+            station_rows = len(handedover_stations) + len(takenover_stations)
             
-            # Create STOCK table after the main report
-            stock_table_end_row = self.formatter.create_stock_table(ws, grand_total_row)
+            # Phase one: values, style ids and merges of every cell
+            with metrics.span('render', rows=station_rows):
+                planner = ReportLayoutPlanner(self.formatter, processor)
+                layout = planner.plan(handedover_data, takenover_data, handedover_stations, takenover_stations)
             
-            # Save file
-            output_filename = self._generate_output_filename(original_filename)
-            wb.save(output_filename)
+            # Phase two: each cell written once, openpyxl builds the workbook and saves
+            # it, the streaming renderer writes the file as it goes
+            if self.renderer == 'xlsxwriter':
+                renderer = StreamingReportRenderer(self.formatter)
+            else:
+                renderer = BulkReportRenderer(self.formatter)
+            with metrics.span('save', rows=station_rows):
+                renderer.render(layout, output_filename, self.SHEET_TITLE)
+            artifact_index.register(output_filename)
             
             return output_filename, f"Final report generated successfully: {output_filename}"
         
         except Exception as e:
             return None, f"Error generating final report: {str(e)}"
     
-    def _populate_report_data(self, ws, handedover_data, takenover_data, handedover_stations, takenover_stations):
-        """Populate the report with actual data preserving order"""
-        current_row = 5  # Start from row 5 (after headers)
-        
-        # Get the maximum length to ensure all stations are covered
-        max_stations = max(len(handedover_stations), len(takenover_stations))
-        
-        for i in range(max_stations):
-            # Calculate how many rows this station group will need
-            max_details_length = 1  # At least 1 row for the main station
-            
-            # Check handedover details
-            if i < len(handedover_stations):
-                station = handedover_stations[i]
-                if station in handedover_data:
-                    details = handedover_data[station]['details']
-                    for classification in ['JUMBO', 'BOXN', 'BTPN', 'BTPG', 'SHRA', 'CONT', 'OTHERS', 'EMPTIES']:  # Add 'EMPTIES'
-                        max_details_length = max(max_details_length, len(details[classification]))
-            
-            # Check takenover details
-            if i < len(takenover_stations):
-                station = takenover_stations[i]
-                if station in takenover_data:
-                    details = takenover_data[station]['details']
-                    for classification in ['JUMBO', 'BOXN', 'BTPN', 'BTPG', 'SHRA', 'CONT', 'OTHERS', 'EMPTIES']:  # Add 'EMPTIES'
-                        max_details_length = max(max_details_length, len(details[classification]))
-            
-            # Populate HANDEDOVER section data
-            if i < len(handedover_stations):
-                station = handedover_stations[i]
-                if station in handedover_data:
-                    handed_info = handedover_data[station]
-                    
-                    # Main station info in first row
-                    ws[f'A{current_row}'] = handed_info['ic_sttn']
-
-                    # L+E counts
-                    details = handed_info['details']  # Move this line up
-                    ws[f'B{current_row}'] = details['NO_OF_TRAINS']
-                    ws[f'C{current_row}'] = details['DIESEL']
-                    ws[f'D{current_row}'] = details['JUMBO_LE']  # JUMBO L+E
-                    ws[f'E{current_row}'] = details['BOXN_LE']   # BOXN L+E  
-                    ws[f'F{current_row}'] = details['BTPN_LE']   # BTPN L+E
-                    ws[f'G{current_row}'] = details['CONT_COUNT']      # CONT
-                    
-                    # Details section - put each station in separate rows vertically
-                    self._populate_classification_vertically(ws, current_row, 'H', details['JUMBO'])   # JUMBO
-                    self._populate_classification_vertically(ws, current_row, 'I', details['BOXN'])    # BOXN
-                    self._populate_classification_vertically(ws, current_row, 'J', details['BTPN'])
-                    self._populate_classification_vertically(ws, current_row, 'K', details['BTPG'])    # Add this line
-                    self._populate_classification_vertically(ws, current_row, 'M', details['SHRA'])    # SHRA
-                    self._populate_classification_vertically(ws, current_row, 'L', details['CONT'])    # Add this line
-                    self._populate_classification_vertically(ws, current_row, 'N', details['OTHERS'])    # Handedover
-                    self._populate_classification_vertically(ws, current_row, 'O', details['EMPTIES'])  # EMPTIES
-            
-            # Populate TAKENOVER section data
-            if i < len(takenover_stations):
-                station = takenover_stations[i]
-                if station in takenover_data:
-                    taken_info = takenover_data[station]
-                    
-                    # Main station info in first row
-                    ws[f'P{current_row}'] = taken_info['ic_sttn']
-
-                    # L+E counts (exclude BOXN)
-                    details = taken_info['details']  # Move this line up
-                    ws[f'Q{current_row}'] = details['NO_OF_TRAINS']
-                    ws[f'R{current_row}'] = details['DIESEL']
-                    ws[f'S{current_row}'] = details['JUMBO_LE']  # JUMBO L+E
-                    ws[f'T{current_row}'] = details['BOXN_PH_OTH']
-                    ws[f'U{current_row}'] = details['BTPN_LE']   # BTPN L+E
-                    ws[f'V{current_row}'] = details['CONT_COUNT'] 
-                    
-                    # Details section - put each station in separate rows vertically
-                    self._populate_classification_vertically(ws, current_row, 'W', details['JUMBO'])   # JUMBO
-                    self._populate_classification_vertically(ws, current_row, 'X', details['BOXN'])    # BOXN
-                    self._populate_classification_vertically(ws, current_row, 'Y', details['BTPN'])    # BTPN
-                    self._populate_classification_vertically(ws, current_row, 'Z', details['BTPG'])    # Add this line
-                    self._populate_classification_vertically(ws, current_row, 'AB', details['SHRA'])   # SHRA
-                    self._populate_classification_vertically(ws, current_row, 'AA', details['CONT'])   # Add this line
-                    self._populate_classification_vertically(ws, current_row, 'AC', details['OTHERS'])   # Takenover
-                    self._populate_classification_vertically(ws, current_row, 'AD', details['EMPTIES'])  # EMPTIES
-            
-            # Apply formatting to all rows used by this station group
-            station_start_row = current_row
-            station_end_row = current_row + max_details_length - 1
-
-            for row_offset in range(max_details_length):
-                self._format_data_row(ws, current_row + row_offset)
-
-            # Apply station-specific formatting with borders and merging
-            has_handedover = i < len(handedover_stations)
-            has_takenover = i < len(takenover_stations)
-            self.formatter.apply_station_group_formatting(ws, station_start_row, station_end_row, has_handedover, has_takenover)
-
-            # Apply special formatting to IC STTN and NO OF TRAINS cells
-            self.formatter.format_station_and_trains_cells(ws, current_row, has_handedover, has_takenover)
-
-            # Move to next station group
-            current_row += max_details_length
-
-            if i < len(handedover_stations) and handedover_stations[i] == "SAUN":
-                saun_index = handedover_stations.index("SAUN") + 1
-                handed_stations_upto_saun = handedover_stations[:saun_index]
-                taken_stations_upto_saun = takenover_stations[:min(saun_index, len(takenover_stations))]
-    
-                processor = ReportDataProcessor()
-                totals_handed = processor.calculate_totals(handedover_data, handed_stations_upto_saun, is_handedover=True)
-                totals_taken = processor.calculate_totals(takenover_data, taken_stations_upto_saun, is_handedover=False)
-    
-                self._add_total_row(ws, current_row, totals_handed, totals_taken, "SUBTOTAL")
-                current_row += 1
-
-        # Return the last row used
-        return current_row - 1  # Return last data row
-    
-    def _populate_classification_vertically(self, ws, start_row, column, station_list):
-        """Populate classification details in separate cells vertically"""
-        if not station_list:
-            return
-        
-        for idx, station in enumerate(station_list):
-            cell_row = start_row + idx
-            ws[f'{column}{cell_row}'] = station
-            
-            # Apply formatting to the detail cell
-            cell = ws[f'{column}{cell_row}']
-            cell.font = self.formatter.normal_font
-            cell.alignment = self.formatter.center_align
-            cell.border = self.formatter.thin_border
-            cell.fill = self.formatter.white_fill
-
-    def _format_data_row(self, ws, row_num):
-        """Apply formatting to a data row"""
-        for col in ['A', 'B', 'C', 'D', 'E', 'F', 'G', 'H', 'I', 'J', 'K', 'L', 'M', 'N', 'O',
-                   'P', 'Q', 'R', 'S', 'T', 'U', 'V', 'W', 'X', 'Y', 'Z', 'AA', 'AB', 'AC', 'AD']:
-            cell = ws[f'{col}{row_num}']
-            cell.font = self.formatter.normal_font
-            cell.alignment = self.formatter.center_align
-            cell.border = self.formatter.thin_border
-            cell.fill = self.formatter.white_fill
-    
-    def _add_total_row(self, ws, current_row, totals_handed, totals_taken, label):
-        """Add a total row with calculated totals"""
-        # HANDEDOVER totals
-        ws[f'A{current_row}'] = label
-        ws[f'B{current_row}'] = f"{totals_handed['NO_OF_TRAINS'][0]}/{totals_handed['NO_OF_TRAINS'][1]}"
-        ws[f'C{current_row}'] = totals_handed['DIESEL']
-        ws[f'D{current_row}'] = f"{totals_handed['JUMBO_LE'][0]}+{totals_handed['JUMBO_LE'][1]}"
-        ws[f'E{current_row}'] = f"{totals_handed['BOXN_LE'][0]}+{totals_handed['BOXN_LE'][1]}"
-        ws[f'F{current_row}'] = f"{totals_handed['BTPN_LE'][0]}+{totals_handed['BTPN_LE'][1]}"
-        ws[f'G{current_row}'] = totals_handed['CONT']
-        
-        # TAKENOVER totals
-        ws[f'P{current_row}'] = label
-        ws[f'Q{current_row}'] = f"{totals_taken['NO_OF_TRAINS'][0]}/{totals_taken['NO_OF_TRAINS'][1]}"
-        ws[f'R{current_row}'] = totals_taken['DIESEL']
-        ws[f'S{current_row}'] = f"{totals_taken['JUMBO_LE'][0]}+{totals_taken['JUMBO_LE'][1]}"
-        ws[f'T{current_row}'] = f"{totals_taken['BOXN_PH_OTH'][0]}+{totals_taken['BOXN_PH_OTH'][1]}"
-        ws[f'U{current_row}'] = f"{totals_taken['BTPN_LE'][0]}+{totals_taken['BTPN_LE'][1]}"
-        ws[f'V{current_row}'] = totals_taken['CONT']
-        
-        # Apply bold formatting and borders to ALL cells in the row
-        from openpyxl.styles import Font
-        bold_font = Font(name='Arial', size=9, bold=True)
-        
-        # Format all columns A through AD
-        for col in ['A', 'B', 'C', 'D', 'E', 'F', 'G', 'H', 'I', 'J', 'K', 'L', 'M', 'N', 'O',
-                   'P', 'Q', 'R', 'S', 'T', 'U', 'V', 'W', 'X', 'Y', 'Z', 'AA', 'AB', 'AC', 'AD']:
-            cell = ws[f'{col}{current_row}']
-            cell.font = bold_font
-            cell.alignment = self.formatter.center_align
-            cell.border = self.formatter.thin_border
-            cell.fill = self.formatter.white_fill
-        
-        self.formatter.format_station_and_trains_cells(ws, current_row, True, True)  # Add this line
-        
-        # Apply thick border around the entire total row
-        self.formatter.apply_thick_border_to_row(ws, current_row, 'A', 'AD')
-    
-    def _get_intermediate_file_path(self, original_filename):
-        """Get the path to the intermediate XLSX file"""
-        from config import Config
-        import os
-        
-        base_name = os.path.splitext(original_filename)[0]
-        intermediate_filename = f"{base_name}_processed.xlsx"
-        return os.path.join(Config.INTERMEDIATE_FOLDER, intermediate_filename)
-
     def _generate_output_filename(self, original_filename):
         """Generate output filename for final report"""
-        from config import Config
-        import os
-        
         base_name = os.path.splitext(original_filename)[0]
         output_filename = f"{base_name}_final_report.xlsx"
         
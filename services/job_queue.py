@@ -0,0 +1,368 @@
+import json
+import logging
+import os
+import queue
+import re
+import tempfile
+import threading
+import time
+import uuid
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+QUEUED = 'queued'
+RUNNING = 'running'
+RETRYING = 'retrying'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+FINISHED_STATES = (SUCCEEDED, FAILED, CANCELLED)
+
+JOB_ID_PATTERN = re.compile(r'[0-9a-f]{32}')
+
+# An unfinished job whose state file missed this many heartbeats lost its process
+LOST_AFTER_HEARTBEATS = 3
+
+class Job:
+    """One queued unit of work and its progress"""
+
+    def __init__(self, func, args=(), kwargs=None, max_retries=0, description='', discard=None):
+        self.id = uuid.uuid4().hex
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs or {}
+        self.max_retries = max_retries
+        self.description = description
+        # Called with the result of a job that finished after it was cancelled
+        self.discard = discard
+
+        self.state = QUEUED
+        self.attempts = 0
+        self.result = None
+        self.message = ''
+        self.cancel_requested = False
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    @property
+    def finished(self):
+        return self.state in FINISHED_STATES
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'description': self.description,
+            'state': self.state,
+            'attempts': self.attempts,
+            'message': self.message,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at
+        }
+
+    def to_record(self):
+        """State file contents: the status plus the string arguments and result"""
+        record = self.to_dict()
+        record['args'] = [arg for arg in self.args if isinstance(arg, str)]
+        record['result'] = self.result if isinstance(self.result, str) else None
+        record['cancel_requested'] = self.cancel_requested
+        return record
+
+    @classmethod
+    def from_record(cls, record):
+        """Read-only Job of another process, it can't be run from here"""
+        job = cls(None, tuple(record.get('args', ())), description=record.get('description', ''))
+        job.id = record['id']
+        for name in ('state', 'attempts', 'message', 'result', 'cancel_requested',
+                     'created_at', 'started_at', 'finished_at'):
+            if name in record:
+                setattr(job, name, record[name])
+        return job
+
+class JobQueue:
+    """In-process job queue served by a pool of worker threads, no external broker
+
+    A job function returns (result, message). A None result or an exception
+    counts as a failure and is retried up to the job's max_retries.
+
+    Cancelling a running job is cooperative: job functions call
+    cancel_requested() to stop early. A result that arrives after the job was
+    cancelled is handed to the job's discard callback, so its output doesn't
+    outlive the job.
+
+    Jobs run in the server process that queued them, but each job's state is
+    also written to a JSON file in the state folder on every change, so any
+    server process can report on it or cancel it (through a .cancel marker
+    file the owning process checks). While a process has unfinished jobs it
+    refreshes their state files every heartbeat; an unfinished job whose file
+    stopped changing belonged to a process that exited and is reported failed.
+    """
+
+    def __init__(self, workers=None, retry_delay=None, retention_seconds=None, state_folder=None,
+                 heartbeat_seconds=None):
+        self.workers = workers or Config.JOB_WORKERS
+        self.retry_delay = Config.JOB_RETRY_DELAY if retry_delay is None else retry_delay
+        self.retention_seconds = Config.JOB_RETENTION_SECONDS if retention_seconds is None else retention_seconds
+        self.state_folder = state_folder or Config.JOB_STATE_FOLDER
+        self.heartbeat_seconds = Config.JOB_HEARTBEAT_SECONDS if heartbeat_seconds is None else heartbeat_seconds
+        self._queue = queue.Queue()
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._threads = []
+        self._heartbeat = None
+        # The job each worker thread is running
+        self._current = threading.local()
+
+    def submit(self, func, *args, max_retries=None, description='', discard=None, **kwargs):
+        """Queue func(*args, **kwargs) and return its Job right away"""
+        if max_retries is None:
+            max_retries = Config.JOB_MAX_RETRIES
+        job = Job(func, args, kwargs, max_retries=max_retries, description=description, discard=discard)
+
+        with self._lock:
+            self._purge_finished()
+            self._jobs[job.id] = job
+            self._save(job)
+            self._start_workers()
+
+        self._queue.put(job)
+        return job
+
+    def get(self, job_id):
+        """A job of this or any other server process, None when unknown or purged"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is not None:
+            return job
+        return self._load(job_id)
+
+    def cancel(self, job_id):
+        """Cancel a job: queued jobs never run, a running job's result is discarded"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                if not job.finished:
+                    job.cancel_requested = True
+                    if job.state in (QUEUED, RETRYING):
+                        self._finish(job, CANCELLED, 'Cancelled')
+                    else:
+                        self._save(job)
+                return job
+
+        # Another process runs it, it picks the marker up before and after running the job
+        job = self._load(job_id)
+        if job is not None and not job.finished:
+            try:
+                with open(self._cancel_path(job_id), 'w'):
+                    pass
+            except OSError as e:
+                logger.warning("Could not request cancellation of job %s: %s", job_id, e)
+            job.cancel_requested = True
+        return job
+
+    def cancel_requested(self):
+        """Whether the job running on the calling worker thread was cancelled"""
+        job = getattr(self._current, 'job', None)
+        return job is not None and self._cancel_requested(job)
+
+    def unfinished(self):
+        """Jobs of every server process that are queued, running or waiting for a retry"""
+        with self._lock:
+            jobs = {job.id: job for job in self._jobs.values() if not job.finished}
+
+        try:
+            names = os.listdir(self.state_folder)
+        except OSError:
+            names = []
+        for name in names:
+            job_id, extension = os.path.splitext(name)
+            if extension != '.json' or job_id in jobs:
+                continue
+            job = self._load(job_id)
+            if job is not None and not job.finished:
+                jobs[job_id] = job
+        return list(jobs.values())
+
+    def stats(self):
+        with self._lock:
+            counts = {}
+            for job in self._jobs.values():
+                counts[job.state] = counts.get(job.state, 0) + 1
+            return {'workers': len(self._threads), 'queued': self._queue.qsize(), 'jobs': counts}
+
+    def _start_workers(self):
+        # Threads start on first use, so forked server workers each get their own
+        self._threads = [thread for thread in self._threads if thread.is_alive()]
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._work, name=f"job-worker-{len(self._threads)}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+        if self.heartbeat_seconds > 0 and (self._heartbeat is None or not self._heartbeat.is_alive()):
+            self._heartbeat = threading.Thread(target=self._beat, name='job-heartbeat', daemon=True)
+            self._heartbeat.start()
+
+    def _beat(self):
+        while True:
+            time.sleep(self.heartbeat_seconds)
+            with self._lock:
+                unfinished = [job for job in self._jobs.values() if not job.finished]
+            for job in unfinished:
+                try:
+                    os.utime(self._state_path(job.id))
+                except OSError:
+                    pass
+
+    def _work(self):
+        while True:
+            job = self._queue.get()
+            try:
+                self._run(job)
+            finally:
+                self._queue.task_done()
+
+    def _run(self, job):
+        with self._lock:
+            if job.finished:
+                return
+            if self._cancel_requested(job):
+                self._finish(job, CANCELLED, 'Cancelled')
+                return
+            job.state = RUNNING
+            job.attempts += 1
+            if job.started_at is None:
+                job.started_at = time.time()
+            self._save(job)
+
+        self._current.job = job
+        try:
+            result, message = job.func(*job.args, **job.kwargs)
+        except Exception as e:
+            logger.exception("Job %s attempt %d raised: %s", job.id, job.attempts, e)
+            result, message = None, f"Error running job: {str(e)}"
+        finally:
+            self._current.job = None
+
+        retry = False
+        discard = None
+        with self._lock:
+            if self._cancel_requested(job):
+                self._finish(job, CANCELLED, 'Cancelled')
+                if result is not None:
+                    discard = job.discard
+            elif result is not None:
+                job.result = result
+                self._finish(job, SUCCEEDED, message)
+            elif job.attempts <= job.max_retries:
+                job.state = RETRYING
+                job.message = message
+                self._save(job)
+                retry = True
+            else:
+                self._finish(job, FAILED, message)
+
+        if discard is not None:
+            try:
+                discard(result)
+            except Exception as e:
+                logger.warning("Could not discard the result of cancelled job %s: %s", job.id, e)
+
+        if retry:
+            # Back off before going to the end of the queue again
+            threading.Timer(self.retry_delay * job.attempts, self._queue.put, args=(job,)).start()
+
+    def _finish(self, job, state, message):
+        job.state = state
+        job.message = message
+        job.finished_at = time.time()
+        self._save(job)
+        self._remove(self._cancel_path(job.id))
+
+    def _cancel_requested(self, job):
+        if not job.cancel_requested and os.path.exists(self._cancel_path(job.id)):
+            job.cancel_requested = True
+        return job.cancel_requested
+
+    def _state_path(self, job_id):
+        return os.path.join(self.state_folder, f"{job_id}.json")
+
+    def _cancel_path(self, job_id):
+        return os.path.join(self.state_folder, f"{job_id}.cancel")
+
+    def _save(self, job):
+        """Write the job's state file, renamed into place so readers never see half of it"""
+        try:
+            os.makedirs(self.state_folder, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(prefix='.tmp-', dir=self.state_folder)
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(job.to_record(), f)
+            os.replace(temp_path, self._state_path(job.id))
+        except OSError as e:
+            # The job still runs, only other processes can't see it
+            logger.warning("Could not write the state of job %s: %s", job.id, e)
+
+    def _load(self, job_id):
+        """Job from its state file, None when there is none"""
+        if not JOB_ID_PATTERN.fullmatch(job_id):
+            return None
+        path = self._state_path(job_id)
+        try:
+            with open(path, encoding='utf-8') as f:
+                record = json.load(f)
+            modified = os.path.getmtime(path)
+        except (OSError, ValueError):
+            return None
+
+        job = Job.from_record(record)
+        if not job.finished and self._lost(modified):
+            job.state = FAILED
+            job.message = 'The server process running this job stopped, please process the file again'
+            job.finished_at = modified
+        return job
+
+    def _lost(self, modified):
+        if self.heartbeat_seconds <= 0:
+            return False
+        return time.time() - modified > self.heartbeat_seconds * LOST_AFTER_HEARTBEATS
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _purge_finished(self):
+        """Forget finished jobs older than the retention period, and their state files"""
+        cutoff = time.time() - self.retention_seconds
+        expired = [job_id for job_id, job in self._jobs.items() if job.finished and job.finished_at < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+        # State files of every process, including jobs whose process exited
+        try:
+            names = os.listdir(self.state_folder)
+        except OSError:
+            return
+        for name in names:
+            job_id, extension = os.path.splitext(name)
+            if name.startswith('.tmp-'):
+                # Left behind by a process that stopped while writing
+                path = os.path.join(self.state_folder, name)
+                try:
+                    if os.path.getmtime(path) < cutoff:
+                        os.remove(path)
+                except OSError:
+                    pass
+                continue
+            if extension != '.json' or job_id in self._jobs:
+                continue
+            job = self._load(job_id)
+            if job is not None and job.finished and job.finished_at < cutoff:
+                self._remove(self._state_path(job_id))
+                self._remove(self._cancel_path(job_id))
+
+# One queue per worker process, job state shared through the state folder
+job_queue = JobQueue()
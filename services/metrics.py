@@ -0,0 +1,162 @@
+import bisect
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:
+    # Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+# Pipeline stages, in the order they run
+STAGES = ('parse', 'classify', 'convert', 'sort', 'aggregate', 'render', 'save')
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+ROW_BUCKETS = (100, 1000, 10000, 100000, 1000000, 10000000)
+MEMORY_BUCKETS = tuple(2 ** 20 * size for size in (1, 4, 16, 64, 256, 1024, 4096))
+
+def _rss_bytes():
+    """Resident memory of this process, from /proc where available"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        if resource is None:
+            return 0
+        # High-water mark instead (KiB on Linux, bytes on macOS)
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return max_rss if sys.platform == 'darwin' else max_rss * 1024
+
+class Histogram:
+    """Cumulative-bucket histogram per label value, as Prometheus expects"""
+
+    def __init__(self, name, help_text, buckets, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        self._series = {}  # label value -> [bucket counts..., +Inf count, sum]
+        
+        # Known labels are exported from the start, with zero counts
+        for label in labels:
+            self._new_series(label)
+
+    def _new_series(self, label):
+        series = self._series[label] = [0] * (len(self.buckets) + 1) + [0.0]
+        return series
+
+    def observe(self, label, value):
+        series = self._series.get(label) or self._new_series(label)
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def render(self, label_name):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for label, series in self._series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), series[:-1]):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{label_name}="{label}",le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{{label_name}="{label}"}} {series[-1]}')
+            lines.append(f'{self.name}_count{{{label_name}="{label}"}} {cumulative}')
+        return lines
+
+class Span:
+    """One timed stage; set rows inside the block when they are known only then"""
+
+    __slots__ = ('stage', 'rows', 'seconds', 'memory_bytes')
+
+    def __init__(self, stage, rows=None):
+        self.stage = stage
+        self.rows = rows
+        self.seconds = None
+        self.memory_bytes = None
+
+class Metrics:
+    """Per-process stage timings, row counts and memory growth, exported for Prometheus
+
+    Spans are cheap (two clock reads and two /proc reads), so they stay on in
+    production. Each server or batch worker process keeps its own numbers.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.durations = Histogram(
+            'conv_stage_duration_seconds', 'Wall time of report pipeline stages', DURATION_BUCKETS, STAGES
+        )
+        self.rows = Histogram('conv_stage_rows', 'Rows handled by report pipeline stages', ROW_BUCKETS, STAGES)
+        self.memory = Histogram(
+            'conv_stage_memory_bytes', 'Resident memory added during report pipeline stages', MEMORY_BUCKETS, STAGES
+        )
+
+    @contextmanager
+    def span(self, stage, rows=None):
+        """Time a pipeline stage and record it when the block finishes"""
+        span = Span(stage, rows)
+        rss_before = _rss_bytes()
+        start = time.perf_counter()
+        try:
+            yield span
+        finally:
+            span.seconds = time.perf_counter() - start
+            span.memory_bytes = max(0, _rss_bytes() - rss_before)
+            self._record(span)
+
+    def _record(self, span):
+        with self._lock:
+            self.durations.observe(span.stage, span.seconds)
+            self.memory.observe(span.stage, span.memory_bytes)
+            if span.rows is not None:
+                self.rows.observe(span.stage, span.rows)
+
+        collected = getattr(self._local, 'spans', None)
+        if collected is not None:
+            collected.append(span)
+        logger.debug("%s: %.3fs, %s rows, +%d bytes", span.stage, span.seconds, span.rows, span.memory_bytes)
+
+    @contextmanager
+    def collect(self):
+        """Gather the spans finished on this thread inside the block, e.g. for one upload"""
+        previous = getattr(self._local, 'spans', None)
+        self._local.spans = spans = []
+        try:
+            yield spans
+        finally:
+            self._local.spans = previous
+            if previous is not None:
+                previous.extend(spans)
+
+    @staticmethod
+    def summarize(spans):
+        """Seconds per stage of a collected run, e.g. 'parse=0.120s sort=0.004s'"""
+        totals = {}
+        for span in spans:
+            totals[span.stage] = totals.get(span.stage, 0.0) + span.seconds
+        return ' '.join(f"{stage}={seconds:.3f}s" for stage, seconds in totals.items())
+
+    def render(self, gauges=None):
+        """Prometheus text exposition of the histograms and any extra gauges"""
+        with self._lock:
+            lines = self.durations.render('stage') + self.rows.render('stage') + self.memory.render('stage')
+
+        for name, (help_text, values) in (gauges or {}).items():
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+            for labels, value in values.items():
+                label_text = ','.join(f'{key}="{label}"' for key, label in labels)
+                lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+
+        lines += [
+            "# HELP conv_process_resident_memory_bytes Resident memory of this process",
+            "# TYPE conv_process_resident_memory_bytes gauge",
+            f"conv_process_resident_memory_bytes {_rss_bytes()}",
+        ]
+        return '\n'.join(lines) + '\n'
+
+# Per process, like the job queue
+metrics = Metrics()
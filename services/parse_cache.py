@@ -0,0 +1,86 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from config import Config
+
+class ParseCache:
+    """LRU cache of parsed upload frames keyed by a hash of the file content"""
+    
+    def __init__(self, max_entries=8, max_bytes=256 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (DataFrame, size in bytes)
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    @staticmethod
+    def file_digest(file_path):
+        """SHA-256 of a file's content"""
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+        return digest.hexdigest()
+    
+    def get_or_parse(self, file_path, columns, parse, digest=None):
+        """Return a copy of the cached frame, calling parse(file_path) on a miss
+        
+        digest is the file's file_digest() when the caller already has it.
+        """
+        key = (digest or self.file_digest(file_path), tuple(columns))
+        
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0].copy()
+            self.misses += 1
+        
+        df = parse(file_path)
+        self.put(key, df)
+        
+        # Callers mutate their frame, so never hand out the cached one
+        return df.copy()
+    
+    def put(self, key, df):
+        """Store a frame and evict least recently used entries over the limits"""
+        size = self._sizeof(df)
+        
+        with self._lock:
+            if key in self._entries:
+                self._total_bytes -= self._entries.pop(key)[1]
+            
+            # A frame larger than the whole cache is not worth keeping
+            if size > self.max_bytes:
+                return
+            
+            self._entries[key] = (df, size)
+            self._total_bytes += size
+            
+            while len(self._entries) > self.max_entries or self._total_bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._total_bytes -= evicted_size
+    
+    @staticmethod
+    def _sizeof(df):
+        return int(df.memory_usage(deep=True).sum())
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+    
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._total_bytes,
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+# One cache per worker process, shared by every stage and request
+parse_cache = ParseCache(Config.PARSE_CACHE_MAX_ENTRIES, Config.PARSE_CACHE_MAX_BYTES)
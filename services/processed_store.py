@@ -0,0 +1,216 @@
+import json
+import logging
+import os
+import pickle
+import shutil
+import tempfile
+import time
+from datetime import date
+from config import Config
+
+try:
+    import pyarrow.feather as feather
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+logger = logging.getLogger(__name__)
+
+class ProcessedDayStore:
+    """Processed report frames and their aggregates, one entry per zone and report day
+
+    Frames are stored as uncompressed Arrow IPC (Feather v2) files, so readers
+    memory-map them instead of re-parsing the upload. Categorical columns stay
+    categorical. A later upload for the same zone and day replaces the entry.
+    The XLSX view is written on demand from the stored frame.
+
+    Reads refresh an entry's mtime, its last access. Every put() removes days
+    not accessed within ttl_seconds, then least recently used days until the
+    store is within max_bytes (0 means no limit for either).
+    """
+
+    FRAME_NAME = 'processed.arrow'
+    AGGREGATES_NAME = 'aggregates.pkl'
+    META_NAME = 'meta.json'
+
+    def __init__(self, store_dir, enabled=True, max_bytes=0, ttl_seconds=0):
+        self.store_dir = store_dir
+        self.enabled = enabled and HAS_PYARROW
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+
+    def _entry_dir(self, zone, report_date):
+        """Entry directory, raises ValueError for a zone or date that is not one (e.g. from a URL)"""
+        if not isinstance(report_date, date):
+            report_date = date.fromisoformat(report_date)
+        if not zone.isalnum():
+            raise ValueError(f"Invalid zone: {zone}")
+        return os.path.join(self.store_dir, zone.upper(), report_date.isoformat())
+
+    def put(self, period, frame=None, aggregates=None, meta=None):
+        """Store a processed upload under its (zone, DateFrom) period, returns the entry dir
+
+        frame may be None (streamed uploads are never held whole), then only the
+        aggregates are kept.
+        """
+        if not self.enabled:
+            return None
+
+        entry_dir = self._entry_dir(period['zone'], period['date_from'])
+        parent_dir = os.path.dirname(entry_dir)
+        os.makedirs(parent_dir, exist_ok=True)
+        temp_dir = tempfile.mkdtemp(prefix='.tmp-', dir=parent_dir)
+
+        try:
+            if frame is not None:
+                # Uncompressed so the file can be memory-mapped
+                feather.write_feather(
+                    frame.reset_index(drop=True), os.path.join(temp_dir, self.FRAME_NAME), compression='uncompressed'
+                )
+            if aggregates is not None:
+                with open(os.path.join(temp_dir, self.AGGREGATES_NAME), 'wb') as f:
+                    pickle.dump(aggregates, f, protocol=pickle.HIGHEST_PROTOCOL)
+            with open(os.path.join(temp_dir, self.META_NAME), 'w', encoding='utf-8') as f:
+                json.dump(dict(
+                    meta or {},
+                    zone=period['zone'],
+                    date_from=period['date_from'].isoformat(),
+                    date_to=period['date_to'].isoformat(),
+                    rows=None if frame is None else len(frame),
+                    stored_at=time.time()
+                ), f)
+
+            # Move the previous entry aside first so the swap leaves no half-written entry
+            if os.path.exists(entry_dir):
+                old_dir = tempfile.mkdtemp(prefix='.old-', dir=parent_dir)
+                os.replace(entry_dir, os.path.join(old_dir, 'entry'))
+                shutil.rmtree(old_dir, ignore_errors=True)
+            os.replace(temp_dir, entry_dir)
+        except Exception:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            raise
+
+        self.prune(keep=entry_dir)
+        return entry_dir
+
+    def entries(self):
+        """[(last_access, size, entry_dir)] of every stored day, least recently used first"""
+        entries = []
+        if not os.path.isdir(self.store_dir):
+            return entries
+
+        for zone_name in os.listdir(self.store_dir):
+            zone_dir = os.path.join(self.store_dir, zone_name)
+            if zone_name.startswith('.') or not os.path.isdir(zone_dir):
+                continue
+            for day in os.listdir(zone_dir):
+                entry_dir = os.path.join(zone_dir, day)
+                # Dot directories are entries being written or removed
+                if day.startswith('.'):
+                    continue
+                try:
+                    size = sum(entry.stat().st_size for entry in os.scandir(entry_dir) if entry.is_file())
+                    entries.append((os.stat(entry_dir).st_mtime, size, entry_dir))
+                except OSError:
+                    continue
+        return sorted(entries)
+
+    def remove(self, entry_dir):
+        """Remove a stored day, moved aside first so readers never see half of it"""
+        old_dir = tempfile.mkdtemp(prefix='.old-', dir=os.path.dirname(entry_dir))
+        try:
+            os.replace(entry_dir, os.path.join(old_dir, 'entry'))
+        except FileNotFoundError:
+            # Removed by another process in between
+            shutil.rmtree(old_dir, ignore_errors=True)
+            return False
+        shutil.rmtree(old_dir, ignore_errors=True)
+        return True
+
+    def prune(self, keep=None):
+        """Remove days past the TTL, then least recently used ones over max_bytes; returns the removed count"""
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        now = time.time()
+        removed = 0
+
+        for last_access, size, entry_dir in entries:
+            if entry_dir == keep:
+                continue
+            expired = self.ttl_seconds and now - last_access > self.ttl_seconds
+            over_limit = self.max_bytes and total > self.max_bytes
+            if not expired and not over_limit:
+                # Least recently used first, so no later day is expired or needed for the limit
+                break
+            if self.remove(entry_dir):
+                removed += 1
+                total -= size
+                logger.info("Removed processed day %s (%d bytes)", entry_dir, size)
+        return removed
+
+    def _touch(self, entry_dir):
+        try:
+            os.utime(entry_dir)
+        except OSError:
+            pass
+
+    def get_meta(self, zone, report_date):
+        try:
+            with open(os.path.join(self._entry_dir(zone, report_date), self.META_NAME), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def get_table(self, zone, report_date, columns=None):
+        """Memory-mapped Arrow table of a stored day, or None"""
+        if not HAS_PYARROW:
+            return None
+        entry_dir = self._entry_dir(zone, report_date)
+        path = os.path.join(entry_dir, self.FRAME_NAME)
+        if not os.path.exists(path):
+            return None
+        self._touch(entry_dir)
+        return feather.read_table(path, columns=columns, memory_map=True)
+
+    def get_frame(self, zone, report_date, columns=None):
+        """Stored processed frame as a DataFrame, or None"""
+        table = self.get_table(zone, report_date, columns)
+        return None if table is None else table.to_pandas()
+
+    def preview(self, zone, report_date, rows=50):
+        """First rows of a stored day without converting the rest"""
+        table = self.get_table(zone, report_date)
+        return None if table is None else table.slice(0, rows).to_pandas()
+
+    def get_aggregates(self, zone, report_date):
+        """(handedover_data, takenover_data) of a stored day, or None"""
+        entry_dir = self._entry_dir(zone, report_date)
+        try:
+            with open(os.path.join(entry_dir, self.AGGREGATES_NAME), 'rb') as f:
+                aggregates = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+        self._touch(entry_dir)
+        return aggregates
+
+    def days(self, zone=None):
+        """Metadata of every stored day, newest first"""
+        zones = [zone.upper()] if zone else (sorted(os.listdir(self.store_dir)) if os.path.isdir(self.store_dir) else [])
+        entries = []
+        for zone_name in zones:
+            zone_dir = os.path.join(self.store_dir, zone_name)
+            if zone_name.startswith('.') or not os.path.isdir(zone_dir):
+                continue
+            for day in os.listdir(zone_dir):
+                if day.startswith('.'):
+                    continue
+                meta = self.get_meta(zone_name, day)
+                if meta is not None:
+                    entries.append(meta)
+        return sorted(entries, key=lambda meta: (meta['date_from'], meta['zone']), reverse=True)
+
+# Shared on disk by every worker process
+processed_store = ProcessedDayStore(
+    Config.PROCESSED_STORE_FOLDER, Config.PROCESSED_STORE_ENABLED,
+    Config.PROCESSED_STORE_MAX_BYTES, Config.PROCESSED_STORE_TTL_SECONDS
+)
@@ -0,0 +1,167 @@
+import hashlib
+import logging
+import os
+import threading
+import pandas as pd
+from config import Config
+from services.station_rules import StationRules
+from services.station_topology import StationTopology
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PH_STATIONS = ['AEMD','TPHS','TSWS','GETS','AECS','GES','NSPN','SPNG','USD','WKB','DRD','GNC','EPH']
+
+class ReferenceFile:
+    """A data file compiled by a loader, reloaded only when the file changes"""
+
+    def __init__(self, path, loader):
+        self.path = path
+        self.loader = loader
+        self.value = None
+        self.digest = None
+        self._stat = None
+
+    def get(self):
+        """Return the compiled value, reloading if the mtime/size or content changed"""
+        try:
+            stat = os.stat(self.path)
+            stat_key = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            stat_key = None
+
+        if stat_key is not None and stat_key == self._stat:
+            return self.value
+
+        if stat_key is None:
+            digest = 'missing'
+        else:
+            with open(self.path, 'rb') as f:
+                digest = hashlib.sha256(f.read()).hexdigest()
+
+        # A touched but unchanged file keeps its compiled value
+        if digest != self.digest:
+            self.value = self.loader(self.path)
+            self.digest = digest
+        self._stat = stat_key
+
+        return self.value
+
+    def invalidate(self):
+        self._stat = None
+
+class ReferenceDataRegistry:
+    """Process-wide compiled reference data shared by every request in a worker"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._files = {
+            'wagon_classifications': ReferenceFile(Config.WAGON_CLASSIFICATIONS_FILE, self._load_classification_map),
+            'ph_stations': ReferenceFile(Config.PH_STATIONS_FILE, self._load_ph_stations),
+            'locochange': ReferenceFile(Config.LOCOCHANGE_FILE, self._load_locochange_types),
+            'station_rules': ReferenceFile(Config.STATION_RULES_FILE, StationRules.load),
+            'station_topology': ReferenceFile(Config.STATION_TOPOLOGY_FILE, StationTopology.load)
+        }
+
+    def _get(self, name):
+        with self._lock:
+            return self._files[name].get()
+
+    @property
+    def classification_map(self):
+        """WAGON_TYPE -> CATEGORY, or None when the file does not exist"""
+        return self._get('wagon_classifications')
+
+    @property
+    def ph_stations(self):
+        return self._get('ph_stations')
+
+    @property
+    def locochange_types(self):
+        return self._get('locochange')
+
+    @property
+    def station_topology(self):
+        """Compiled StationTopology of data/station_topology.csv"""
+        return self._get('station_topology')
+
+    @property
+    def station_rules(self):
+        """Compiled StationRules of data/station_rules.csv"""
+        return self._get('station_rules')
+
+    def categories(self, domain):
+        """Known values of a column domain, used as the leading categories of its dtype"""
+        if domain == 'zone':
+            return list(self.station_topology.zone_order)
+        if domain == 'station':
+            # Ordered stations, PH destinations and the stations conversion rules read (SAU) or write
+            return self.station_topology.stations + sorted(self.ph_stations) + self.station_rules.stations
+        if domain == 'le':
+            return ['L', 'E']
+        if domain == 'wagon_type':
+            classification_map = self.classification_map or {}
+            return sorted(classification_map) + list(self.locochange_types)
+        if domain == 'classification':
+            classification_map = self.classification_map or {}
+            return sorted(set(classification_map.values()))
+        return []
+    
+    def digest(self, name):
+        """Content hash of one data file, for caches that depend on just that file"""
+        with self._lock:
+            reference_file = self._files[name]
+            reference_file.get()
+            return reference_file.digest
+    
+    def invalidate(self, name=None):
+        """Force a re-check of one data file (or all) after writing to it"""
+        with self._lock:
+            files = [self._files[name]] if name else self._files.values()
+            for reference_file in files:
+                reference_file.invalidate()
+
+    def version(self):
+        """Short id that changes whenever any reference data changes"""
+        with self._lock:
+            digest = hashlib.sha256()
+            for name, reference_file in sorted(self._files.items()):
+                reference_file.get()
+                digest.update(f"{name}={reference_file.digest};".encode())
+            return digest.hexdigest()[:16]
+
+    @staticmethod
+    def _load_classification_map(path):
+        if not os.path.exists(path):
+            return None
+        try:
+            df = pd.read_csv(path)
+            # Create mapping dictionary: WAGON_TYPE -> CATEGORY
+            return dict(zip(df['WAGON_TYPE'], df['CATEGORY']))
+        except Exception as e:
+            logger.error("Error loading wagon classification data: %s", e)
+            return {}
+
+    @staticmethod
+    def _load_ph_stations(path):
+        if not os.path.exists(path):
+            # Create default if doesn't exist
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w', newline='', encoding='utf-8') as f:
+                f.write('STATION_CODE\n')
+                for station in DEFAULT_PH_STATIONS:
+                    f.write(f'{station}\n')
+
+        ph_df = pd.read_csv(path)
+        return frozenset(ph_df['STATION_CODE'].str.strip().str.upper())
+
+    @staticmethod
+    def _load_locochange_types(path):
+        try:
+            with open(path, encoding='utf-8') as f:
+                return [line.strip().upper() for line in f if line.strip()]
+        except Exception as e:
+            logger.warning("Could not load locoChange.csv: %s", e)
+            return []
+
+# One registry per worker process
+reference_data = ReferenceDataRegistry()
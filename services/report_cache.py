@@ -0,0 +1,141 @@
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import tempfile
+import time
+from config import Config
+
+class ReportCache:
+    """On-disk cache of final reports and their aggregates, keyed by content
+
+    Entries are directories named by key, written to a temp directory and
+    renamed into place, so every server process can share the cache
+    without locking. Hits refresh the entry's mtime, which orders eviction.
+    """
+
+    REPORT_NAME = 'report.xlsx'
+    AGGREGATES_NAME = 'aggregates.pkl'
+    META_NAME = 'meta.json'
+
+    def __init__(self, cache_dir, max_bytes):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0
+
+    @staticmethod
+    def make_key(upload_digest, reference_version, generator_version):
+        """Key of a report: upload content, reference data and generator output version"""
+        return hashlib.sha256(f"{upload_digest}:{reference_version}:{generator_version}".encode()).hexdigest()
+
+    def _entry_dir(self, key):
+        return os.path.join(self.cache_dir, key)
+
+    def get(self, key):
+        """Path of the cached report, or None"""
+        if not self.enabled:
+            return None
+
+        entry_dir = self._entry_dir(key)
+        report_path = os.path.join(entry_dir, self.REPORT_NAME)
+        if not os.path.exists(report_path):
+            return None
+
+        try:
+            os.utime(entry_dir)
+        except OSError:
+            # Evicted by another process in between
+            return None
+        return report_path
+
+    def get_aggregates(self, key):
+        """(handedover_data, takenover_data) of a cached report, or None"""
+        if self.get(key) is None:
+            return None
+        try:
+            with open(os.path.join(self._entry_dir(key), self.AGGREGATES_NAME), 'rb') as f:
+                return pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+
+    def put(self, key, report_path, aggregates=None, meta=None):
+        """Copy a generated report (and aggregates) into the cache"""
+        if not self.enabled:
+            return None
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        entry_dir = self._entry_dir(key)
+        temp_dir = tempfile.mkdtemp(prefix='.tmp-', dir=self.cache_dir)
+
+        try:
+            shutil.copyfile(report_path, os.path.join(temp_dir, self.REPORT_NAME))
+            if aggregates is not None:
+                with open(os.path.join(temp_dir, self.AGGREGATES_NAME), 'wb') as f:
+                    pickle.dump(aggregates, f, protocol=pickle.HIGHEST_PROTOCOL)
+            with open(os.path.join(temp_dir, self.META_NAME), 'w', encoding='utf-8') as f:
+                json.dump(dict(meta or {}, created_at=time.time()), f)
+
+            try:
+                os.rename(temp_dir, entry_dir)
+            except OSError:
+                # Another process stored the same key first
+                shutil.rmtree(temp_dir, ignore_errors=True)
+        except Exception:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            raise
+
+        self.evict()
+        return os.path.join(entry_dir, self.REPORT_NAME)
+
+    def materialize(self, key, output_path):
+        """Copy a cached report to output_path, returns output_path or None on a miss"""
+        cached_path = self.get(key)
+        if cached_path is None:
+            return None
+        try:
+            shutil.copyfile(cached_path, output_path)
+        except OSError:
+            return None
+        return output_path
+
+    def _entries(self):
+        """[(mtime, size, path)] of every complete entry"""
+        entries = []
+        if not os.path.isdir(self.cache_dir):
+            return entries
+
+        for name in os.listdir(self.cache_dir):
+            if name.startswith('.tmp-'):
+                continue
+            entry_dir = os.path.join(self.cache_dir, name)
+            try:
+                size = sum(entry.stat().st_size for entry in os.scandir(entry_dir) if entry.is_file())
+                entries.append((os.stat(entry_dir).st_mtime, size, entry_dir))
+            except OSError:
+                continue
+        return entries
+
+    def evict(self):
+        """Remove least recently used entries until the cache is under its size cap"""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+
+        for _, size, entry_dir in entries:
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            total -= size
+
+    def clear(self):
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def stats(self):
+        entries = self._entries()
+        return {'entries': len(entries), 'bytes': sum(size for _, size, _ in entries), 'max_bytes': self.max_bytes}
+
+# Shared on disk by every worker process
+report_cache = ReportCache(Config.REPORT_CACHE_FOLDER, Config.REPORT_CACHE_MAX_BYTES)
@@ -0,0 +1,209 @@
+from openpyxl.utils import column_index_from_string, range_boundaries
+from .report_formatter import ReportFormatter, NUM_COLUMNS, outline_border, style_id
+
+DATA_START_ROW = 5  # Start from row 5 (after headers)
+
+# First column of each section, the other columns are offsets from it
+HANDEDOVER_START = 1   # A
+TAKENOVER_START = 16   # P
+COUNT_OFFSET = 1       # NO OF TRAINS through CONT
+MERGED_COLUMNS = 7     # IC STTN through CONT are merged over a station group
+
+# DETAILS columns in sheet order (H..O and W..AD)
+DETAIL_COLUMNS = ['JUMBO', 'BOXN', 'BTPN', 'BTPG', 'CONT', 'SHRA', 'OTHERS', 'EMPTIES']
+DETAIL_OFFSET = 7
+
+class ReportLayout:
+    """Precomputed values, style ids and merges of the final report, in row order"""
+
+    def __init__(self, title):
+        self.title = title
+        self.cells = {}  # row -> {column: (value, style_id)}
+        self.merges = []  # (first_row, first_col, last_row, last_col)
+        self.column_widths = {}  # column index -> width
+        self.row_heights = {}  # row -> height
+
+    def set(self, row, column, value=None, style=None):
+        self.cells.setdefault(row, {})[column] = (value, style)
+
+    def set_style(self, row, column, style):
+        value, _ = self.cells.get(row, {}).get(column, (None, None))
+        self.set(row, column, value, style)
+
+    def value(self, row, column):
+        return self.cells.get(row, {}).get(column, (None, None))[0]
+
+    def style(self, row, column):
+        return self.cells.get(row, {}).get(column, (None, None))[1]
+
+    def merge(self, first_row, first_col, last_row, last_col):
+        """Merge a range, giving every cell the style a merged area displays"""
+        # A merged area shows the top-left cell's style, edges included. Every planned
+        # style has all four edges, so the bottom-right cell never adds one (as in openpyxl)
+        merged_style = self.style(first_row, first_col)
+
+        for row in range(first_row, last_row + 1):
+            for column in range(first_col, last_col + 1):
+                self.set_style(row, column, merged_style)
+        self.merges.append((first_row, first_col, last_row, last_col))
+
+    def iter_rows(self):
+        """Yield (row, [(column, value, style_id), ...]) in ascending row order"""
+        for row in sorted(self.cells):
+            columns = self.cells[row]
+            yield row, [(column, *columns[column]) for column in sorted(columns)]
+
+    @property
+    def last_row(self):
+        return max(self.cells) if self.cells else 0
+
+class ReportLayoutPlanner:
+    """Compute the complete report layout before anything is written"""
+
+    def __init__(self, formatter=None, data_processor=None):
+        self.formatter = formatter or ReportFormatter()
+        self.data_processor = data_processor
+
+    def plan(self, handedover_data, takenover_data, handedover_stations, takenover_stations):
+        layout = ReportLayout(self.formatter.report_title())
+
+        self._plan_header(layout)
+        last_data_row = self._plan_station_groups(layout, handedover_data, takenover_data, handedover_stations, takenover_stations)
+
+        # GRAND TOTAL row after the last station group
+        totals_handed = self.data_processor.calculate_totals(handedover_data, handedover_stations)
+        totals_taken = self.data_processor.calculate_totals(takenover_data, takenover_stations)
+        grand_total_row = last_data_row + 1
+        self._plan_total_row(layout, grand_total_row, totals_handed, totals_taken, "GRAND TOTAL")
+
+        self._plan_stock_table(layout, grand_total_row)
+
+        return layout
+
+    def _plan_header(self, layout):
+        """Rows 1-4: title, section headers and column headers"""
+        formatter = self.formatter
+
+        for (row, column), (value, style) in formatter.header_cells(layout.title).items():
+            layout.set(row, column, value, style)
+
+        for cell_range in formatter.HEADER_MERGES + formatter.ROW3_MERGES:
+            min_col, min_row, max_col, max_row = range_boundaries(cell_range)
+            layout.merge(min_row, min_col, max_row, max_col)
+
+        for column, width in formatter.COLUMN_WIDTHS.items():
+            layout.column_widths[column_index_from_string(column)] = width
+        layout.row_heights.update(formatter.HEADER_ROW_HEIGHTS)
+
+    def _plan_station_groups(self, layout, handedover_data, takenover_data, handedover_stations, takenover_stations):
+        """Station groups from row 5 with the SUBTOTAL rows, returns the last row used"""
+        current_row = DATA_START_ROW
+        max_stations = max(len(handedover_stations), len(takenover_stations))
+
+        for i in range(max_stations):
+            has_handedover = i < len(handedover_stations)
+            has_takenover = i < len(takenover_stations)
+            handed_info = handedover_data.get(handedover_stations[i]) if has_handedover else None
+            taken_info = takenover_data.get(takenover_stations[i]) if has_takenover else None
+
+            # Calculate how many rows this station group will need
+            group_rows = 1
+            for info in (handed_info, taken_info):
+                if info is not None:
+                    for classification in DETAIL_COLUMNS:
+                        group_rows = max(group_rows, len(info['details'][classification]))
+
+            start_row = current_row
+            end_row = current_row + group_rows - 1
+
+            # Thick border around the group, thin inside
+            for row in range(start_row, end_row + 1):
+                for column in range(1, NUM_COLUMNS + 1):
+                    border = outline_border(row, column, start_row, end_row)
+                    layout.set(row, column, None, style_id('normal', 'center', border))
+
+            if handed_info is not None:
+                self._plan_section(layout, start_row, HANDEDOVER_START, handed_info, is_handedover=True)
+            if taken_info is not None:
+                self._plan_section(layout, start_row, TAKENOVER_START, taken_info, is_handedover=False)
+
+            # IC STTN and NO OF TRAINS in size 14 bold
+            for has_section, section_start in ((has_handedover, HANDEDOVER_START), (has_takenover, TAKENOVER_START)):
+                if has_section:
+                    self._set_font(layout, start_row, section_start, 'station_trains')
+                    self._set_font(layout, start_row, section_start + 1, 'station_trains')
+
+            # Merge single-value columns over the station group
+            if end_row > start_row:
+                for has_section, section_start in ((has_handedover, HANDEDOVER_START), (has_takenover, TAKENOVER_START)):
+                    if has_section:
+                        for column in range(section_start, section_start + MERGED_COLUMNS):
+                            layout.merge(start_row, column, end_row, column)
+
+            # Move to next station group
+            current_row += group_rows
+
+            subtotal_stations = self.data_processor.subtotal_after(handedover_stations, takenover_stations, i)
+            if subtotal_stations is not None:
+                totals_handed = self.data_processor.calculate_totals(handedover_data, subtotal_stations[0])
+                totals_taken = self.data_processor.calculate_totals(takenover_data, subtotal_stations[1])
+
+                self._plan_total_row(layout, current_row, totals_handed, totals_taken, "SUBTOTAL")
+                current_row += 1
+
+        # Return the last row used
+        return current_row - 1
+
+    def _plan_section(self, layout, row, section_start, info, is_handedover):
+        """Station name, counts and vertical DETAILS lists of one section"""
+        layout.set(row, section_start, info['ic_sttn'], layout.style(row, section_start))
+
+        values = info['counts'].display_values(is_handedover)
+        for offset, value in enumerate(values):
+            column = section_start + COUNT_OFFSET + offset
+            layout.set(row, column, value, layout.style(row, column))
+
+        # Details section - put each station in separate rows vertically
+        for offset, classification in enumerate(DETAIL_COLUMNS):
+            column = section_start + DETAIL_OFFSET + offset
+            for idx, station in enumerate(info['details'][classification]):
+                layout.set(row + idx, column, station, layout.style(row + idx, column))
+
+    @staticmethod
+    def _set_font(layout, row, column, font):
+        _, alignment, border = layout.style(row, column)
+        layout.set_style(row, column, style_id(font, alignment, border))
+
+    def _plan_total_row(self, layout, row, totals_handed, totals_taken, label):
+        """SUBTOTAL / GRAND TOTAL row: bold, thick border around the row"""
+        for column in range(1, NUM_COLUMNS + 1):
+            border = outline_border(row, column, row, row)
+            font = 'station_trains' if column in (1, 2, 16, 17) else 'bold'
+            layout.set(row, column, None, style_id(font, 'center', border))
+
+        for section_start, totals, is_handedover in ((HANDEDOVER_START, totals_handed, True), (TAKENOVER_START, totals_taken, False)):
+            layout.set(row, section_start, label, layout.style(row, section_start))
+            for offset, value in enumerate(totals.display_values(is_handedover)):
+                column = section_start + COUNT_OFFSET + offset
+                layout.set(row, column, value, layout.style(row, column))
+
+    def _plan_stock_table(self, layout, start_row):
+        """STOCK table with OB, H/O, T/O, CB columns"""
+        formatter = self.formatter
+        table_start_row = start_row + formatter.STOCK_GAP_ROWS
+
+        for column, header in enumerate(formatter.STOCK_HEADERS, start=1):
+            layout.set(table_start_row, column, header, style_id('column_header', 'center'))
+
+        for i, stock_item in enumerate(formatter.STOCK_ITEMS):
+            row = table_start_row + 1 + i
+            layout.set(row, 1, stock_item, style_id('normal', 'center'))
+            # Empty cells for manual entry
+            for column in range(2, len(formatter.STOCK_HEADERS) + 1):
+                layout.set(row, column, "", style_id('normal', 'center'))
+
+        for column, width in formatter.STOCK_COLUMN_WIDTHS.items():
+            idx = column_index_from_string(column)
+            layout.column_widths[idx] = max(layout.column_widths.get(idx, 0), width)
+
+        return table_start_row + len(formatter.STOCK_ITEMS)
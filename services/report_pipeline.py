@@ -0,0 +1,245 @@
+import logging
+import os
+import numpy as np
+from config import Config
+from services.artifact_index import artifact_index
+from services.csv_processor import CSVProcessor
+from services.metrics import metrics
+from services.parse_cache import parse_cache
+from services.processed_store import processed_store
+from services.reference_data import reference_data
+from services.report_cache import report_cache
+from services.stage_cache import UploadStages, stage_cache
+from services.xlsx_generator import XLSXGenerator
+from services.final_report_generator import FinalReportGenerator
+
+logger = logging.getLogger(__name__)
+
+class ReportPipeline:
+    """Run an uploaded CSV through to the final report without an XLSX round-trip"""
+    
+    def __init__(self, write_intermediate=None, streaming=None):
+        if write_intermediate is None:
+            write_intermediate = Config.WRITE_INTERMEDIATE_XLSX
+        self.write_intermediate = write_intermediate
+        
+        # None picks streaming by upload size, streamed runs never write the intermediate file
+        self.streaming = streaming
+        
+        self.csv_processor = CSVProcessor()
+        self.xlsx_generator = XLSXGenerator()
+        self.final_report_generator = FinalReportGenerator()
+        self.report_processor = self.final_report_generator.data_processor
+        
+        # Path of the intermediate workbook, set only when it was written
+        self.intermediate_path = None
+        
+        # Content hash of each upload, read once per run and shared by every cache
+        self.upload_digests = {}
+    
+    def add_custom_classifications(self, custom_classifications):
+        """Add custom wagon classifications before running the pipeline"""
+        self.csv_processor.wagon_classifier.add_custom_classifications(custom_classifications)
+    
+    def upload_digest(self, filename):
+        """Content hash of an upload, the file is only hashed the first time"""
+        digest = self.upload_digests.get(filename)
+        if digest is None:
+            digest = self.upload_digests[filename] = parse_cache.file_digest(os.path.join(Config.UPLOAD_FOLDER, filename))
+        return digest
+    
+    def build_report_frame(self, filename):
+        """Parse the upload and return the frame the report stages consume"""
+        processed_df = self.csv_processor.process_csv(filename, self.upload_digest(filename))
+        intermediate_df = self.xlsx_generator.build_intermediate_frame(processed_df)
+        
+        if self.write_intermediate:
+            self.intermediate_path = self.xlsx_generator.write_intermediate_xlsx(intermediate_df, filename)
+        
+        # Blank cells come back as NaN when the workbook is read, so keep the
+        # in-memory frame identical to what the old round-trip produced
+        return intermediate_df.replace('', np.nan)
+    
+    def build_report_data(self, filename):
+        """UploadStages of an upload held in memory, recomputing only stages whose inputs changed
+        
+        Stage outputs are cached per upload content. When only wagon classifications
+        changed, just the rows of the changed wagon types are reclassified and just
+        their stations re-aggregated; parsing, conversion and sorting are reused.
+        """
+        # Conversion and sorting depend on the station rules and topology as well as the upload
+        key = (
+            self.upload_digest(filename),
+            reference_data.digest('station_rules'),
+            reference_data.digest('station_topology')
+        )
+        classification_map = dict(self.csv_processor.wagon_classifier.classification_map)
+        aggregate_inputs = (reference_data.digest('ph_stations'), reference_data.digest('locochange'))
+        
+        cached = stage_cache.get(key)
+        if cached is None:
+            stages, stations = UploadStages(self.build_report_frame(filename), classification_map), None
+        else:
+            stages, stations = self._reclassify(cached, classification_map)
+            if self.write_intermediate:
+                self.intermediate_path = self.xlsx_generator.write_intermediate_xlsx(stages.report_df, filename)
+        
+        if stations is None or cached.aggregate_inputs != aggregate_inputs:
+            handedover_data = self.report_processor.process_handedover_data(stages.report_df)
+            takenover_data = self.report_processor.process_takenover_data(stages.report_df)
+        else:
+            handedover_data, takenover_data = self.report_processor.update_section_data(
+                cached.handedover_data, cached.takenover_data, stages.report_df, stations
+            )
+        
+        stages = UploadStages(
+            stages.report_df, stages.classification_map, aggregate_inputs, handedover_data, takenover_data
+        )
+        stage_cache.put(key, stages)
+        return stages
+    
+    def _reclassify(self, cached, classification_map):
+        """(stages, {section: stations whose rows were reclassified}) for a new classification map"""
+        changed = cached.changed_wagon_types(classification_map)
+        if not changed:
+            return cached, {'handedover': set(), 'takenover': set()}
+        
+        # The cached frame may be in use by another request, so work on a copy
+        report_df = cached.report_df.copy()
+        masks = self.csv_processor.reclassify(report_df, changed)
+        
+        stations = {}
+        for section, aggregator, column in [
+            ('handedover', self.report_processor.handedover_aggregator, 'HANDEDOVER CLASSIFICATION'),
+            ('takenover', self.report_processor.takenover_aggregator, 'TAKENOVER CLASSIFICATION')
+        ]:
+            station_column = report_df[aggregator.columns['station']]
+            stations[section] = set(station_column[masks[column]].dropna())
+        
+        return UploadStages(report_df, classification_map), stations
+    
+    def use_streaming(self, filename):
+        """Stream uploads larger than STREAMING_THRESHOLD_BYTES instead of loading them whole"""
+        if self.streaming is not None:
+            return self.streaming
+        file_path = os.path.join(Config.UPLOAD_FOLDER, filename)
+        return os.path.getsize(file_path) > Config.STREAMING_THRESHOLD_BYTES
+    
+    def iter_report_chunks(self, filename):
+        """(report_chunk, sort_keys) for each chunk of an upload, for process_chunks"""
+        chunks = self.csv_processor.iter_processed_chunks(filename, Config.STREAMING_CHUNK_ROWS)
+        for processed_chunk, sort_keys in chunks:
+            report_chunk = self.xlsx_generator.build_intermediate_chunk(processed_chunk)
+            yield report_chunk.replace('', np.nan), sort_keys
+    
+    def cache_key(self, filename):
+        """Report cache key of an upload with the current reference data"""
+        return report_cache.make_key(
+            self.upload_digest(filename), reference_data.version(), self.final_report_generator.cache_version()
+        )
+    
+    def cached_report(self, filename, key=None):
+        """Put a cached final report in place, returns its path or None on a miss"""
+        if not report_cache.enabled:
+            return None
+        key = key or self.cache_key(filename)
+        output_filename = self.final_report_generator._generate_output_filename(filename)
+        report_path = report_cache.materialize(key, output_filename)
+        if report_path:
+            artifact_index.register(report_path)
+        return report_path
+    
+    def aggregate(self, filename):
+        """(report_df, handedover_data, takenover_data) of an upload, report_df is None when streamed"""
+        if self.use_streaming(filename):
+            return (None,) + self.report_processor.process_chunks(self.iter_report_chunks(filename))
+        
+        stages = self.build_report_data(filename)
+        return stages.report_df, stages.handedover_data, stages.takenover_data
+    
+    def report_summary(self, filename):
+        """(summary, cached) of an upload's report numbers, without rendering the workbook"""
+        # Aggregates of an already rendered report are reused
+        aggregates = report_cache.get_aggregates(self.cache_key(filename)) if report_cache.enabled else None
+        cached = aggregates is not None
+        if not cached:
+            aggregates = self.aggregate(filename)[1:]
+        handedover_data, takenover_data = aggregates
+        
+        return self.report_processor.summarize(
+            handedover_data,
+            takenover_data,
+            self.final_report_generator.order_stations(handedover_data.keys()),
+            self.final_report_generator.order_stations(takenover_data.keys())
+        ), cached
+    
+    def run(self, filename, upload_digest=None, cancelled=None):
+        """Generate the final report, returns (report_path, message)
+        
+        upload_digest is the upload's content hash when the caller already computed it.
+        cancelled() is checked before the report file is written, a cancelled run
+        returns (None, 'Cancelled') and leaves no report behind.
+        """
+        cancelled = cancelled or (lambda: False)
+        if upload_digest:
+            self.upload_digests[filename] = upload_digest
+        key = self.cache_key(filename) if report_cache.enabled else None
+        if cancelled():
+            return None, 'Cancelled'
+        if key:
+            cached_path = self.cached_report(filename, key)
+            if cached_path:
+                return cached_path, f"Final report served from cache: {cached_path}"
+        
+        # Stage timings of this upload, on top of the process-wide histograms
+        with metrics.collect() as spans:
+            report_df, handedover_data, takenover_data = self.aggregate(filename)
+            if cancelled():
+                return None, 'Cancelled'
+            
+            report_path, message = self.final_report_generator.generate_final_report(
+                handedover_data,
+                takenover_data,
+                filename
+            )
+        logger.info("Report stages for %s: %s", filename, metrics.summarize(spans))
+        
+        if report_path and cancelled():
+            self.discard_report(report_path)
+            return None, 'Cancelled'
+        
+        if report_path and key:
+            try:
+                report_cache.put(key, report_path, aggregates=(handedover_data, takenover_data), meta={'filename': filename})
+            except Exception as e:
+                # The report itself is fine, it just won't be reused
+                logger.warning("Could not cache report for %s: %s", filename, e)
+        
+        if report_path:
+            self.store_processed_day(filename, report_df, (handedover_data, takenover_data))
+        
+        return report_path, message
+    
+    @staticmethod
+    def discard_report(report_path):
+        """Remove a report nobody is waiting for any more"""
+        artifact_index.forget(report_path)
+        try:
+            os.remove(report_path)
+        except FileNotFoundError:
+            pass
+    
+    def store_processed_day(self, filename, report_df, aggregates):
+        """Keep the processed frame and aggregates under the upload's zone and report day"""
+        if not processed_store.enabled:
+            return None
+        try:
+            period = self.csv_processor.read_report_period(filename)
+            if period is None:
+                logger.info("No Zone/DateFrom line in %s, processed data not stored", filename)
+                return None
+            return processed_store.put(period, report_df, aggregates, meta={'filename': filename})
+        except Exception as e:
+            # Like the report cache, a failed store never fails the report
+            logger.warning("Could not store processed data for %s: %s", filename, e)
+            return None
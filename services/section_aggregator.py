@@ -0,0 +1,281 @@
+import numpy as np
+import pandas as pd
+from services.categorical_normalizer import map_distinct
+from services.station_counts import StationCounts
+
+class SectionAggregator:
+    """Compute every per-station metric of one report section in a single groupby pass"""
+
+    # Classifications with their own DETAILS column, everything else goes to OTHERS
+    MAIN_CLASSIFICATIONS = ['JUMBO', 'BOX', 'BOXN', 'BTPN', 'BTPG', 'SHRA', 'CONT']
+
+    # Detail column each classification is reported under (BOX from intermediate is BOXN)
+    DETAIL_TARGETS = {
+        'JUMBO': 'JUMBO',
+        'BOX': 'BOXN',
+        'BOXN': 'BOXN',
+        'BTPN': 'BTPN',
+        'BTPG': 'BTPG',
+        'SHRA': 'SHRA',
+        'CONT': 'CONT'
+    }
+
+    # Classifications that get an L+E count
+    LE_CLASSIFICATIONS = ['JUMBO', 'BOX', 'BTPN']
+
+    GROUP_KEYS = ['station', 'classification', 'le', 'sttn_to', 'type']
+
+    def __init__(self, is_handedover, detail_classifications, locochange_types):
+        self.is_handedover = is_handedover
+        self.detail_classifications = detail_classifications
+        self.locochange_types = locochange_types
+
+        if is_handedover:
+            self.columns = {
+                'station': 'IC STTN (Copy)',
+                'classification': 'HANDEDOVER CLASSIFICATION',
+                'le': 'HANDED OVER L/E',
+                'sttn_to': 'HANDED OVER STTN TO',
+                'type': 'HANDED OVER TYPE',
+                'loco_type': 'HANDED OVER LOCO TYPE'
+            }
+        else:
+            self.columns = {
+                'station': 'IC STTN',
+                'classification': 'TAKENOVER CLASSIFICATION',
+                'le': 'TAKEN OVER L/E',
+                'sttn_to': 'TAKEN OVER STTN TO',
+                'type': 'TAKEN OVER TYPE',
+                'loco_type': 'TAKEN OVER LOCO TYPE'
+            }
+
+    # Sort key of a row in the processed frame: zone, IC STTN and IC STTN (Copy)
+    # priorities, then the row's position in the upload
+    ORDER_COLUMNS = ['zone_priority', 'station_priority', 'copy_priority', 'position']
+    
+    SUM_COLUMNS = ['rows', 'diesel', 'locos', 'trains']
+    
+    def _work_frame(self, df):
+        """Group keys and per-row metrics of a section frame"""
+        columns = self.columns
+        sttn_to = df[columns['sttn_to']]
+        wagon_type = df[columns['type']]
+        loco_type = df[columns['loco_type']]
+        
+        # Categorical keys are grouped on their codes, flags are computed per distinct value
+        return pd.DataFrame({
+            'station': df[columns['station']].array,
+            'classification': df[columns['classification']].array,
+            'le': df[columns['le']].array,
+            'sttn_to': sttn_to.array,
+            'type': wagon_type.array,
+            # Locos whose type starts with WDG are diesel
+            'diesel': map_distinct(loco_type, lambda types: types.astype(str).str.startswith('WDG'), False),
+            'locos': loco_type.notna().to_numpy(),
+            # Trains exclude loco change rows listed in locoChange.csv
+            'trains': ~map_distinct(
+                wagon_type, lambda types: types.astype(str).str.strip().str.upper().isin(self.locochange_types), False
+            ) & sttn_to.notna().to_numpy()
+        })
+    
+    def aggregate(self, df):
+        """Collapse section rows into one row per (station, classification, L/E, STTN TO, TYPE)"""
+        work = self._work_frame(df)
+        work['first_row'] = np.arange(len(df))
+        work = work[work['station'].notna()]
+        
+        table = work.groupby(self.GROUP_KEYS, sort=False, dropna=False, observed=True).agg(
+            rows=('first_row', 'size'),
+            first_row=('first_row', 'min'),
+            diesel=('diesel', 'sum'),
+            locos=('locos', 'sum'),
+            trains=('trains', 'sum')
+        ).reset_index()
+        
+        # Details list stations in order of first appearance
+        return table.sort_values('first_row', kind='stable', ignore_index=True)
+    
+    def aggregate_partial(self, df, sort_keys):
+        """Partial table of one chunk of an unsorted upload, mergeable with merge_partials
+        
+        sort_keys holds each row's ORDER_COLUMNS, so the group's first appearance in
+        the sorted upload is the smallest key among its rows.
+        """
+        work = self._work_frame(df)
+        for column in self.ORDER_COLUMNS:
+            work[column] = sort_keys[column].to_numpy()
+        work = work[work['station'].notna()].sort_values(self.ORDER_COLUMNS, kind='stable')
+        
+        aggregations = {'rows': ('diesel', 'size')}
+        aggregations.update({column: (column, 'sum') for column in ['diesel', 'locos', 'trains']})
+        aggregations.update({column: (column, 'first') for column in self.ORDER_COLUMNS})
+        
+        return work.groupby(self.GROUP_KEYS, sort=False, dropna=False, observed=True).agg(**aggregations).reset_index()
+    
+    def merge_partials(self, partials):
+        """Merge partial tables into one, ordered like aggregate() on the sorted upload"""
+        partials = [partial for partial in partials if partial is not None]
+        if not partials:
+            return pd.DataFrame(columns=self.GROUP_KEYS + self.SUM_COLUMNS + self.ORDER_COLUMNS + ['first_row'])
+        
+        table = pd.concat(partials, ignore_index=True).sort_values(self.ORDER_COLUMNS, kind='stable')
+        
+        aggregations = {column: (column, 'sum') for column in self.SUM_COLUMNS}
+        aggregations.update({column: (column, 'first') for column in self.ORDER_COLUMNS})
+        merged = table.groupby(self.GROUP_KEYS, sort=False, dropna=False, observed=True).agg(**aggregations).reset_index()
+        
+        # Groups come out in order of their smallest sort key
+        merged['first_row'] = np.arange(len(merged))
+        return merged
+    
+    def build_section_data(self, table, ph_stations=None):
+        """Assemble {station: {'ic_sttn', 'details', 'counts'}} from an aggregated table"""
+        accumulators = {}
+
+        for group in table.itertuples(index=False):
+            acc = accumulators.get(group.station)
+            if acc is None:
+                acc = accumulators[group.station] = self._new_accumulator()
+            self._accumulate(acc, group, ph_stations)
+
+        section_data = {}
+        for station in pd.Index(list(accumulators)).sort_values():
+            section_data[station] = {
+                'ic_sttn': station,
+                'details': self._build_details(accumulators[station]),
+                'counts': self._build_counts(accumulators[station])
+            }
+
+        return section_data
+
+    def process(self, df, ph_stations=None):
+        """Aggregate a section frame and return its per-station data"""
+        return self.build_section_data(self.aggregate(df), ph_stations)
+
+    def update(self, section_data, df, stations, ph_stations=None):
+        """section_data with only the given stations recomputed from df
+        
+        A station's data depends only on its own rows, so every other station is reused.
+        """
+        rows = df[self.columns['station']].isin(list(stations)).to_numpy()
+        updated = {station: data for station, data in section_data.items() if station not in stations}
+        updated.update(self.process(df[rows], ph_stations))
+        return {station: updated[station] for station in pd.Index(list(updated)).sort_values()}
+
+    def _new_accumulator(self):
+        return {
+            'detail_counts': {classification: {} for classification in self.detail_classifications},
+            'others': {},  # classification -> {sttn: count}, in order of first appearance
+            'empties': {},
+            'le_counts': {classification: [0, 0] for classification in self.LE_CLASSIFICATIONS},
+            'cont_count': 0,
+            'ph_oth': [0, 0],
+            'diesel': 0,
+            'locos': 0,
+            'trains': 0
+        }
+
+    def _accumulate(self, acc, group, ph_stations):
+        """Fold one aggregated group into a station accumulator"""
+        classification = group.classification
+        le = group.le
+        rows = int(group.rows)
+        is_loaded = le == 'L'
+        is_le = is_loaded or le == 'E'
+        # A single NaN object keeps blank STTN TO values counted together
+        sttn_to = np.nan if pd.isna(group.sttn_to) else group.sttn_to
+
+        acc['diesel'] += int(group.diesel)
+        acc['locos'] += int(group.locos)
+        acc['trains'] += int(group.trains)
+
+        if pd.isna(classification):
+            has_classification = False
+        else:
+            has_classification = True
+
+            if classification in acc['detail_counts']:
+                # CONT is listed for both L and E in handedover, everything else only for L
+                include = is_le if (self.is_handedover and classification == 'CONT') else is_loaded
+                if include:
+                    counts = acc['detail_counts'][classification]
+                    counts[sttn_to] = counts.get(sttn_to, 0) + rows
+
+            if classification not in self.MAIN_CLASSIFICATIONS:
+                counts = acc['others'].setdefault(classification, {})
+                if is_loaded:
+                    counts[sttn_to] = counts.get(sttn_to, 0) + rows
+
+            if classification in acc['le_counts']:
+                if is_loaded:
+                    acc['le_counts'][classification][0] += rows
+                elif le == 'E':
+                    acc['le_counts'][classification][1] += rows
+
+            if classification == 'CONT' and is_le:
+                acc['cont_count'] += rows
+
+            if classification == 'BOX' and ph_stations is not None:
+                # PH: PH stations loaded only, OTH: all other stations loaded or empty
+                if sttn_to in ph_stations:
+                    if is_loaded:
+                        acc['ph_oth'][0] += rows
+                elif is_le:
+                    acc['ph_oth'][1] += rows
+
+        # Empties exclude CONT wagon types
+        if le == 'E' and not (has_classification and classification == 'CONT'):
+            wagon_type = np.nan if pd.isna(group.type) else group.type
+            acc['empties'][wagon_type] = acc['empties'].get(wagon_type, 0) + rows
+
+    def _build_details(self, acc):
+        """Format accumulated station lists into the DETAILS columns of the report"""
+        details = {
+            'JUMBO': [],
+            'BOXN': [],  # This will contain both BOX and BOXN from intermediate
+            'BTPN': [],
+            'BTPG': [],
+            'SHRA': [],
+            'CONT': [],
+            'OTHERS': [],
+            'EMPTIES': []
+        }
+
+        # Format as "STTN" or "STTN(count)"
+        for classification in self.detail_classifications:
+            target = self.DETAIL_TARGETS.get(classification)
+            if target is None:
+                continue
+            for sttn, count in acc['detail_counts'][classification].items():
+                details[target].append(str(sttn) if count == 1 else f"{sttn}({count})")
+
+        for classification, counts in acc['others'].items():
+            for sttn, count in counts.items():
+                if count == 1:
+                    details['OTHERS'].append(f"{classification}[{sttn}]")
+                else:
+                    details['OTHERS'].append(f"{classification}[{sttn}]-{count}")
+
+        for wagon_type, count in acc['empties'].items():
+            details['EMPTIES'].append(wagon_type if count == 1 else f"{wagon_type}-{count}")
+
+        return details
+
+    def _build_counts(self, acc):
+        """Integer counts for a station, formatted only when the report is rendered"""
+        le_counts = acc['le_counts']
+        return StationCounts(
+            trains=acc['trains'],
+            locos=acc['locos'],
+            diesel=acc['diesel'],
+            jumbo_l=le_counts['JUMBO'][0],
+            jumbo_e=le_counts['JUMBO'][1],
+            # BOXN L+E is a handedover column, PH+OTH a takenover one
+            boxn_l=le_counts['BOX'][0] if self.is_handedover else 0,
+            boxn_e=le_counts['BOX'][1] if self.is_handedover else 0,
+            boxn_ph=0 if self.is_handedover else acc['ph_oth'][0],
+            boxn_oth=0 if self.is_handedover else acc['ph_oth'][1],
+            btpn_l=le_counts['BTPN'][0],
+            btpn_e=le_counts['BTPN'][1],
+            cont=acc['cont_count']
+        )
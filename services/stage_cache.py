@@ -0,0 +1,48 @@
+from config import Config
+from services.parse_cache import ParseCache
+
+class UploadStages:
+    """Stage outputs of one upload and the reference data each stage was computed with
+
+    Entries are never changed once cached; a rerun with new inputs caches a new one.
+    """
+
+    __slots__ = ('report_df', 'classification_map', 'aggregate_inputs', 'handedover_data', 'takenover_data')
+
+    def __init__(self, report_df, classification_map, aggregate_inputs=None, handedover_data=None, takenover_data=None):
+        # Parsed, converted, classified and sorted rows, as the aggregation stages consume them
+        self.report_df = report_df
+        # WAGON_TYPE -> CATEGORY the classification columns were computed with
+        self.classification_map = classification_map
+        # Reference data the aggregates were computed with
+        self.aggregate_inputs = aggregate_inputs
+        self.handedover_data = handedover_data
+        self.takenover_data = takenover_data
+
+    def changed_wagon_types(self, classification_map):
+        """Wagon types whose classification differs from the cached one"""
+        previous = self.classification_map
+        return {
+            wagon_type for wagon_type in previous.keys() | classification_map.keys()
+            if previous.get(wagon_type) != classification_map.get(wagon_type)
+        }
+
+class StageCache(ParseCache):
+    """LRU cache of UploadStages keyed by upload content, bounded like the parse cache"""
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    @staticmethod
+    def _sizeof(stages):
+        return int(stages.report_df.memory_usage(deep=True).sum())
+
+# One cache per worker process
+stage_cache = StageCache(Config.STAGE_CACHE_MAX_ENTRIES, Config.STAGE_CACHE_MAX_BYTES)
@@ -0,0 +1,65 @@
+class StationCounts:
+    """Integer counts for one station (or a total) in one report section"""
+
+    FIELDS = (
+        'trains',      # NO OF TRAINS A: trains excluding loco change rows
+        'locos',       # NO OF TRAINS B: rows with a loco type
+        'diesel',
+        'jumbo_l', 'jumbo_e',
+        'boxn_l', 'boxn_e',        # handedover BOXN L+E
+        'boxn_ph', 'boxn_oth',     # takenover BOXN PH+OTH
+        'btpn_l', 'btpn_e',
+        'cont'
+    )
+
+    __slots__ = FIELDS
+
+    def __init__(self, **counts):
+        for field in self.FIELDS:
+            setattr(self, field, int(counts.get(field, 0)))
+
+    @classmethod
+    def total(cls, records):
+        """Sum a sequence of StationCounts"""
+        result = cls()
+        for record in records:
+            result += record
+        return result
+
+    def __iadd__(self, other):
+        for field in self.FIELDS:
+            setattr(self, field, getattr(self, field) + getattr(other, field))
+        return self
+
+    def __add__(self, other):
+        result = StationCounts(**self.to_dict())
+        result += other
+        return result
+
+    def __eq__(self, other):
+        if not isinstance(other, StationCounts):
+            return NotImplemented
+        return self.to_dict() == other.to_dict()
+
+    def __repr__(self):
+        values = ', '.join(f"{field}={getattr(self, field)}" for field in self.FIELDS)
+        return f"StationCounts({values})"
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+    def display_values(self, is_handedover=True):
+        """Values for the NO OF TRAINS through CONT columns of the report"""
+        if is_handedover:
+            boxn = f"{self.boxn_l}+{self.boxn_e}"
+        else:
+            boxn = f"{self.boxn_ph}+{self.boxn_oth}"
+
+        return [
+            f"{self.trains}/{self.locos}",
+            self.diesel,
+            f"{self.jumbo_l}+{self.jumbo_e}",
+            boxn,
+            f"{self.btpn_l}+{self.btpn_e}",
+            self.cont
+        ]
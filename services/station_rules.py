@@ -0,0 +1,139 @@
+import logging
+import os
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Used when data/station_rules.csv is missing, same rules as the shipped file
+SAUS_ZONES = ['WR', 'CR', 'KR', 'SW', 'SR', 'SEC', 'ECO', 'SC']
+DEFAULT_STATION_RULES = [
+    ('both', 'NW', 'CNA', None, 'AII'),
+    ('taken_over', None, 'SAU', frozenset(SAUS_ZONES), 'SAUS'),
+    ('taken_over', None, 'SAU', None, 'SAUN'),
+    ('handed_over', None, 'SAU', frozenset(SAUS_ZONES), 'SAUS'),
+    ('handed_over', None, 'SAU', None, 'SAUN')
+]
+
+class StationRules:
+    """Compiled station conversion table, applied to both report sections in one pass
+
+    A rule is (section, zone, station, counterparty zones, new station): rows of
+    ZONE TO `zone` at IC STTN `station` whose counterparty zone is in the set
+    get `new station`. The counterparty is TAKEN OVER ZONE FROM for the taken
+    over section (IC STTN) and HANDED OVER ZONE TO for the handed over section
+    (IC STTN (Copy)); section 'both' applies to either. A zone or zone set of
+    None ('*' in the file) matches anything, including blanks. Rules match the
+    original IC STTN and the first matching rule of a section wins.
+    """
+
+    SECTIONS = ('taken_over', 'handed_over')
+    OUTPUT_COLUMNS = {'taken_over': 'IC STTN', 'handed_over': 'IC STTN (Copy)'}
+    COUNTERPARTY_COLUMNS = {'taken_over': 'TAKEN OVER ZONE FROM', 'handed_over': 'HANDED OVER ZONE TO'}
+    ANY = '*'
+
+    def __init__(self, rules):
+        self.rules = list(rules)
+        for section, _, _, _, _ in self.rules:
+            if section not in self.SECTIONS + ('both',):
+                raise ValueError(f"Unknown station rule section: {section}")
+
+        # Station -> its rules of each section, in table order
+        self._by_station = {}
+        for section, zone, station, counterparty_zones, new_station in self.rules:
+            station_rules = self._by_station.setdefault(station, {name: [] for name in self.SECTIONS})
+            for name in self.SECTIONS if section == 'both' else (section,):
+                station_rules[name].append((zone, counterparty_zones, new_station))
+
+    @classmethod
+    def load(cls, path):
+        """Rules of a SECTION,ZONE,STATION,COUNTERPARTY_ZONES,NEW_STATION file, the defaults if it is missing"""
+        if not os.path.exists(path):
+            logger.warning("%s not found, using the built-in station rules", path)
+            return cls(DEFAULT_STATION_RULES)
+
+        rules_df = pd.read_csv(path, dtype=str, keep_default_na=False)
+        rules = []
+        for section, zone, station, counterparty_zones, new_station in rules_df[
+            ['SECTION', 'ZONE', 'STATION', 'COUNTERPARTY_ZONES', 'NEW_STATION']
+        ].itertuples(index=False):
+            zone = zone.strip().upper()
+            counterparty_zones = counterparty_zones.strip().upper()
+            rules.append((
+                section.strip().lower(),
+                None if zone in ('', cls.ANY) else zone,
+                station.strip().upper(),
+                None if counterparty_zones in ('', cls.ANY) else frozenset(counterparty_zones.split()),
+                new_station.strip().upper()
+            ))
+        return cls(rules)
+
+    @property
+    def stations(self):
+        """Every station the rules read or write, in table order"""
+        return list(dict.fromkeys(
+            station for _, _, source, _, target in self.rules for station in (source, target)
+        ))
+
+    def resolve(self, section, zone, station, counterparty):
+        """New station of one row of a section, the station itself when no rule matches"""
+        for rule_zone, counterparty_zones, new_station in self._by_station.get(station, {}).get(section, ()):
+            if rule_zone is not None and rule_zone != zone:
+                continue
+            if counterparty_zones is not None and counterparty not in counterparty_zones:
+                continue
+            return new_station
+        return station
+
+    def apply(self, df):
+        """(IC STTN, IC STTN (Copy)) of df, both converted from df's original IC STTN
+
+        Only rows at a station with rules are looked at, and each distinct
+        (ZONE TO, IC STTN, counterparty zones) combination is resolved once.
+        Categorical columns stay categorical.
+        """
+        stations = df['IC STTN']
+        outputs = {section: stations.copy() for section in self.SECTIONS}
+
+        # Rows at a station some rule converts
+        codes, uniques = pd.factorize(stations)
+        has_rules = np.append(pd.Index(np.asarray(uniques, dtype=object)).isin(list(self._by_station)), False)
+        positions = np.flatnonzero(has_rules[codes])
+        if not len(positions):
+            return outputs['taken_over'], outputs['handed_over']
+
+        # One integer key per distinct combination of the columns the rules read
+        key_columns = ['ZONE TO', 'IC STTN'] + [self.COUNTERPARTY_COLUMNS[section] for section in self.SECTIONS]
+        keys = np.zeros(len(positions), dtype=np.int64)
+        columns = []
+        for column in key_columns:
+            if column in df.columns:
+                column_codes, column_uniques = pd.factorize(df[column].iloc[positions])
+                column_uniques = np.append(np.asarray(column_uniques, dtype=object), None)
+            else:
+                column_codes, column_uniques = np.full(len(positions), -1), np.array([None], dtype=object)
+            # Missing values (code -1) pick the trailing None
+            columns.append((column_codes, column_uniques))
+            keys = keys * len(column_uniques) + (column_codes + 1)
+        _, first_rows, inverse = np.unique(keys, return_index=True, return_inverse=True)
+
+        combinations = [
+            tuple(column_uniques[column_codes[row]] for column_codes, column_uniques in columns)
+            for row in first_rows
+        ]
+        for section_number, section in enumerate(self.SECTIONS):
+            new_stations = np.array(
+                [self.resolve(section, zone, station, counterparties[section_number])
+                 for zone, station, *counterparties in combinations],
+                dtype=object
+            )[inverse]
+
+            output = outputs[section]
+            if isinstance(output.dtype, pd.CategoricalDtype):
+                missing = pd.Index(new_stations).unique().difference(output.cat.categories)
+                if len(missing):
+                    output = output.cat.add_categories(missing)
+            output.iloc[positions] = new_stations
+            outputs[section] = output
+
+        return outputs['taken_over'], outputs['handed_over']
@@ -0,0 +1,109 @@
+import logging
+import os
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Used when data/station_topology.csv is missing, same order as the shipped file
+DEFAULT_STATION_TOPOLOGY = [
+    ('CR', ['BSR', 'JL', 'KNW']),
+    ('WC', ['SHRN', 'NAD', 'MKC', 'MTA', 'CNA']),
+    ('NW', ['BEC', 'AII', 'HMT', 'BLDI', 'PNU']),
+    ('DFCR', ['BHU', 'CECC', 'GGM', 'MSH', 'SAUN', 'SAUS', 'MPR', 'GTX', 'PAO', 'NOL', 'BHET', 'SAH', 'SJN'])
+]
+DEFAULT_SUBTOTAL_AFTER = {'SAUN'}
+
+# Sort rank of stations outside the topology
+UNKNOWN_RANK = 1000
+
+class StationEntry:
+    """Where a station sits in the report"""
+
+    __slots__ = ('zone', 'rank', 'group', 'order', 'ends_group')
+
+    def __init__(self, zone, rank, group, order, ends_group):
+        self.zone = zone
+        # Position within its zone, the CSV sort key
+        self.rank = rank
+        # Subtotal group, a SUBTOTAL row follows the station that ends one
+        self.group = group
+        # Position in the report
+        self.order = order
+        self.ends_group = ends_group
+
+class StationTopology:
+    """Zones, their stations in report order and the subtotal groups
+
+    Built from (zone, station, subtotal after) rows in report order, zones in
+    order of first appearance. Each station belongs to one zone.
+    """
+
+    def __init__(self, rows):
+        self.zone_order = []
+        self.station_order = {}
+        self.entries = {}
+
+        group = 0
+        for order, (zone, station, subtotal_after) in enumerate(rows):
+            if station in self.entries:
+                raise ValueError(f"Station {station} is listed twice in the topology")
+            stations = self.station_order.get(zone)
+            if stations is None:
+                self.zone_order.append(zone)
+                stations = self.station_order[zone] = []
+            self.entries[station] = StationEntry(zone, len(stations), group, order, subtotal_after)
+            stations.append(station)
+            if subtotal_after:
+                group += 1
+
+        self._zone_rank = {zone: rank for rank, zone in enumerate(self.zone_order)}
+
+        # (zone, station) lookup for whole columns
+        self._station_index = pd.MultiIndex.from_tuples(
+            [(entry.zone, station) for station, entry in self.entries.items()]
+        )
+        self._station_ranks = np.array([entry.rank for entry in self.entries.values()], dtype=np.int64)
+
+    @classmethod
+    def load(cls, path):
+        """Topology of a ZONE,STATION,SUBTOTAL_AFTER file, the default one if it is missing"""
+        if not os.path.exists(path):
+            logger.warning("%s not found, using the built-in station topology", path)
+            return cls([
+                (zone, station, station in DEFAULT_SUBTOTAL_AFTER)
+                for zone, stations in DEFAULT_STATION_TOPOLOGY for station in stations
+            ])
+
+        topology_df = pd.read_csv(path, dtype=str, keep_default_na=False)
+        return cls([
+            (zone.strip().upper(), station.strip().upper(), subtotal_after.strip().upper() in ('Y', 'YES', 'TRUE', '1'))
+            for zone, station, subtotal_after in topology_df[['ZONE', 'STATION', 'SUBTOTAL_AFTER']].itertuples(index=False)
+        ])
+
+    @property
+    def stations(self):
+        """Every station in report order"""
+        return list(self.entries)
+
+    def zone_rank(self, zone):
+        """Position of a zone, unknown zones after all known ones"""
+        return self._zone_rank.get(zone, len(self.zone_order))
+
+    def station_ranks(self, zones, stations):
+        """Rank of each (zone, station) pair, UNKNOWN_RANK for pairs outside the topology"""
+        positions = self._station_index.get_indexer(pd.MultiIndex.from_arrays([zones, stations]))
+        return np.where(positions >= 0, self._station_ranks[np.maximum(positions, 0)], UNKNOWN_RANK)
+
+    def order(self, stations):
+        """Stations in report order, stations outside the topology last in their given order"""
+        stations = list(stations)
+        known = sorted(
+            (station for station in stations if station in self.entries),
+            key=lambda station: self.entries[station].order
+        )
+        return known + [station for station in stations if station not in self.entries]
+
+    def ends_subtotal_group(self, station):
+        entry = self.entries.get(station)
+        return entry is not None and entry.ends_group
@@ -0,0 +1,240 @@
+import logging
+import os
+import threading
+import time
+from config import Config
+from services.artifact_index import artifact_index
+from services.job_queue import job_queue
+from services.processed_store import processed_store
+
+logger = logging.getLogger(__name__)
+
+class StoredFile:
+    """One file of a storage area as seen by a sweep"""
+
+    __slots__ = ('name', 'path', 'size', 'last_access', 'pinned')
+
+    def __init__(self, name, path, size, last_access):
+        self.name = name
+        self.path = path
+        self.size = size
+        self.last_access = last_access
+        self.pinned = False
+
+class StorageArea:
+    """A managed folder with its byte quota, TTL and pinning rule
+
+    max_bytes or ttl_seconds of 0 means no limit. pinned(stored_file, now) keeps
+    a file through both, as does being listed in the folder's KEEP_FILE (the
+    sample files shipped with the app). Subfolders are left alone: the
+    processed day store under the intermediate folder is an area of its own
+    (ProcessedDayArea), and the job queue removes its state files after
+    JOB_RETENTION_SECONDS.
+    """
+
+    # One file name per line, dot files are never scanned so it never lists itself
+    KEEP_FILE = '.storage-keep'
+
+    def __init__(self, name, folder, max_bytes, ttl_seconds, pinned):
+        self.name = name
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.pinned = pinned
+
+    def scan(self):
+        """[StoredFile] of the folder's files, least recently used first"""
+        files = []
+        if not os.path.isdir(self.folder):
+            return files
+
+        for entry in os.scandir(self.folder):
+            # Dot files are temp files still being written
+            if entry.name.startswith('.'):
+                continue
+            try:
+                if not entry.is_file(follow_symlinks=False):
+                    continue
+                stat = entry.stat(follow_symlinks=False)
+            except OSError:
+                continue
+            # A file is last used when it was written or last touched, whichever is later
+            files.append(StoredFile(entry.name, entry.path, stat.st_size, max(stat.st_atime, stat.st_mtime)))
+        return sorted(files, key=lambda stored_file: stored_file.last_access)
+
+    def kept(self):
+        """Names listed in the folder's KEEP_FILE"""
+        try:
+            with open(os.path.join(self.folder, self.KEEP_FILE), encoding='utf-8') as f:
+                return {line.strip() for line in f if line.strip() and not line.startswith('#')}
+        except OSError:
+            return set()
+
+    def is_pinned(self, stored_file, now, kept):
+        return stored_file.name in kept or self.pinned(stored_file, now)
+
+    def remove(self, stored_file):
+        """Delete a stored file, raises FileNotFoundError if it is already gone"""
+        os.remove(stored_file.path)
+        artifact_index.forget(stored_file.path)
+
+class ProcessedDayArea(StorageArea):
+    """The processed day store, each stored zone and day removed as a whole
+
+    Entries are named ZONE/YYYY-MM-DD. A day's last access is its directory's
+    mtime, which the store refreshes on every read.
+    """
+
+    def __init__(self, name, store, max_bytes, ttl_seconds, pinned):
+        super().__init__(name, store.store_dir, max_bytes, ttl_seconds, pinned)
+        self.store = store
+
+    def scan(self):
+        return [
+            StoredFile(os.path.relpath(entry_dir, self.folder).replace(os.sep, '/'), entry_dir, size, last_access)
+            for last_access, size, entry_dir in self.store.entries()
+        ]
+
+    def remove(self, stored_file):
+        if not self.store.remove(stored_file.path):
+            raise FileNotFoundError(stored_file.path)
+
+class StorageManager:
+    """Keeps the upload, intermediate and report folders within their quotas
+
+    Last access is the file's atime, set explicitly by touch() whenever an
+    artifact is served or processed, so every worker process sees the same
+    order without shared state. A background sweeper removes files past their
+    TTL, then least recently used files until each folder is under its quota.
+    The processed day store is swept the same way, a stored day at a time.
+    Pinned files are never removed:
+
+    - uploads while a queued or running report job of any server process reads
+      them, read from the job state files the job queue keeps on disk
+    - intermediate workbooks, processed days, reports and batch zips for STORAGE_MIN_AGE_SECONDS
+      after their last access, so a file is not removed before it is downloaded
+    - files listed in a folder's StorageArea.KEEP_FILE
+
+    Quotas and TTLs apply to the folders as a whole. Every server process runs
+    its own sweeper over the same folders, so the eviction counts and last
+    sweep time in usage() are those of the answering process only.
+    """
+
+    def __init__(self, interval=None, min_age_seconds=None):
+        self.interval = Config.STORAGE_SWEEP_INTERVAL if interval is None else interval
+        self.min_age_seconds = Config.STORAGE_MIN_AGE_SECONDS if min_age_seconds is None else min_age_seconds
+        self.areas = [
+            StorageArea('uploads', Config.UPLOAD_FOLDER,
+                        Config.UPLOAD_QUOTA_BYTES, Config.UPLOAD_TTL_SECONDS, self._upload_pinned),
+            StorageArea('intermediate', Config.INTERMEDIATE_FOLDER,
+                        Config.INTERMEDIATE_QUOTA_BYTES, Config.INTERMEDIATE_TTL_SECONDS, self._recently_used),
+            ProcessedDayArea('processed_days', processed_store,
+                             Config.PROCESSED_STORE_MAX_BYTES, Config.PROCESSED_STORE_TTL_SECONDS, self._recently_used),
+            StorageArea('reports', Config.REPORTS_FOLDER,
+                        Config.REPORTS_QUOTA_BYTES, Config.REPORTS_TTL_SECONDS, self._recently_used)
+        ]
+        self._lock = threading.Lock()
+        self._thread = None
+        self._active_uploads = frozenset()
+        self.last_sweep = None
+        self.evicted = {area.name: {'files': 0, 'bytes': 0} for area in self.areas}
+
+    def touch(self, path):
+        """Record an access to a file, keeping its mtime (which the artifact index hashes by)"""
+        try:
+            stat = os.stat(path)
+            os.utime(path, ns=(time.time_ns(), stat.st_mtime_ns))
+        except OSError:
+            pass
+
+    def start(self):
+        """Start the sweeper thread of this process unless it is running or disabled"""
+        if self.interval <= 0:
+            return
+        with self._lock:
+            # Threads do not survive a fork, so each server worker starts its own
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name='storage-sweeper', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.sweep()
+            except Exception as e:
+                logger.exception("Storage sweep failed: %s", e)
+
+    def _upload_pinned(self, stored_file, now):
+        return stored_file.name in self._active_uploads or self._recently_used(stored_file, now)
+
+    def _recently_used(self, stored_file, now):
+        return now - stored_file.last_access < self.min_age_seconds
+
+    def sweep(self):
+        """Remove expired files, then least recently used ones over each quota; returns usage()"""
+        with self._lock:
+            now = time.time()
+            self._active_uploads = frozenset(
+                arg for job in job_queue.unfinished() for arg in job.args if isinstance(arg, str)
+            )
+
+            for area in self.areas:
+                files = area.scan()
+                kept = area.kept()
+                total = sum(stored_file.size for stored_file in files)
+                for stored_file in files:
+                    stored_file.pinned = area.is_pinned(stored_file, now, kept)
+
+                for stored_file in files:
+                    if stored_file.pinned:
+                        continue
+                    expired = area.ttl_seconds and now - stored_file.last_access > area.ttl_seconds
+                    over_quota = area.max_bytes and total > area.max_bytes
+                    # Files are least recently used first, so once one is neither
+                    # expired nor needed for the quota, none after it are
+                    if not expired and not over_quota:
+                        break
+                    if self._remove(area, stored_file):
+                        total -= stored_file.size
+
+            self.last_sweep = now
+        return self.usage()
+
+    def _remove(self, area, stored_file):
+        try:
+            area.remove(stored_file)
+        except FileNotFoundError:
+            # Another worker's sweeper got there first
+            return True
+        except OSError as e:
+            logger.warning("Could not remove %s: %s", stored_file.path, e)
+            return False
+
+        self.evicted[area.name]['files'] += 1
+        self.evicted[area.name]['bytes'] += stored_file.size
+        logger.info("Removed %s from %s (%d bytes)", stored_file.name, area.name, stored_file.size)
+        return True
+
+    def usage(self):
+        """Per-area file count, size, limits and removals of this process"""
+        now = time.time()
+        areas = {}
+        for area in self.areas:
+            files = area.scan()
+            kept = area.kept()
+            areas[area.name] = {
+                'folder': area.folder,
+                'files': len(files),
+                'bytes': sum(stored_file.size for stored_file in files),
+                'max_bytes': area.max_bytes,
+                'ttl_seconds': area.ttl_seconds,
+                'pinned': sum(1 for stored_file in files if area.is_pinned(stored_file, now, kept)),
+                'oldest_access': files[0].last_access if files else None,
+                'evicted': dict(self.evicted[area.name])
+            }
+        return {'areas': areas, 'last_sweep': self.last_sweep, 'sweep_interval': self.interval}
+
+# One sweeper per worker process, all working on the same folders
+storage_manager = StorageManager()
@@ -0,0 +1,111 @@
+import xlsxwriter
+from .report_formatter import ReportFormatter
+
+class MergeListMissing(Exception):
+    """The installed xlsxwriter keeps merged ranges somewhere else"""
+
+class StreamingReportRenderer:
+    """Write a ReportLayout with xlsxwriter in constant_memory mode, one row at a time
+
+    merge_range() can't be used in constant_memory mode: it writes blank cells
+    into rows that have not been reached yet, and those rows are then flushed
+    early. Every cell of a merged area is written with the area's style anyway,
+    so the ranges are added to the worksheet's merge list, which is what
+    merge_range() does after its checks. That list is private, which is why
+    xlsxwriter is pinned in requirements.txt. Each worksheet is checked for the
+    list before any row is written, and a version without it renders the
+    workbook in memory with merge_range() instead.
+    """
+
+    BORDER_STYLES = {'thin': 1, 'thick': 5}
+
+    # Excel's default font metrics: width units are characters of a 7px digit
+    MAX_DIGIT_WIDTH = 7
+
+    WORKBOOK_OPTIONS = {
+        'constant_memory': True,
+        'strings_to_formulas': False,
+        'strings_to_urls': False,
+        'nan_inf_to_errors': True
+    }
+
+    def __init__(self, formatter=None):
+        self.formatter = formatter or ReportFormatter()
+
+    def render(self, layout, output_path, sheet_name):
+        try:
+            return self._write(layout, output_path, sheet_name, streaming=True)
+        except MergeListMissing:
+            return self._write(layout, output_path, sheet_name, streaming=False)
+
+    @staticmethod
+    def has_merge_list(ws):
+        """Whether this xlsxwriter keeps merged ranges in the list merge_range() appends to"""
+        return isinstance(getattr(ws, 'merge', None), list)
+
+    def _write(self, layout, output_path, sheet_name, streaming):
+        workbook = xlsxwriter.Workbook(output_path, dict(self.WORKBOOK_OPTIONS, constant_memory=streaming))
+        try:
+            ws = workbook.add_worksheet(sheet_name)
+            if streaming and not self.has_merge_list(ws):
+                # Nothing is written yet, the caller starts over in memory
+                raise MergeListMissing()
+            formats = {}
+
+            for column, width in layout.column_widths.items():
+                # Pixel widths store the same width openpyxl writes, without xlsxwriter's padding
+                ws.set_column_pixels(column - 1, column - 1, width * self.MAX_DIGIT_WIDTH)
+
+            # Merged areas are written cell by cell below, so only the ranges are registered
+            for first_row, first_col, last_row, last_col in layout.merges:
+                if streaming:
+                    ws.merge.append([first_row - 1, first_col - 1, last_row - 1, last_col - 1])
+                else:
+                    ws.merge_range(first_row - 1, first_col - 1, last_row - 1, last_col - 1, None)
+
+            for row, cells in layout.iter_rows():
+                if row in layout.row_heights:
+                    ws.set_row(row - 1, layout.row_heights[row])
+
+                for column, value, style in cells:
+                    cell_format = self._get_format(workbook, formats, style)
+                    if value is None:
+                        ws.write_blank(row - 1, column - 1, None, cell_format)
+                    else:
+                        ws.write(row - 1, column - 1, value, cell_format)
+        finally:
+            workbook.close()
+
+        return output_path
+
+    def _get_format(self, workbook, formats, style):
+        """One xlsxwriter Format per distinct style id"""
+        if style is None:
+            return None
+        cell_format = formats.get(style)
+        if cell_format is None:
+            cell_format = formats[style] = workbook.add_format(self._format_properties(style))
+        return cell_format
+
+    def _format_properties(self, style):
+        font, alignment, border = style
+        formatter = self.formatter
+        properties = {'pattern': 1, 'bg_color': f"#{formatter.FILL_COLOR}"}
+
+        if font is not None:
+            spec = formatter.FONT_SPECS[font]
+            properties.update(font_name=formatter.FONT_NAME, font_size=spec['size'], bold=spec.get('bold', False))
+
+        if alignment is not None:
+            spec = formatter.ALIGNMENT_SPECS[alignment]
+            properties['align'] = spec['horizontal']
+            properties['valign'] = 'vcenter'
+            if spec.get('wrap_text'):
+                properties['text_wrap'] = True
+            if spec.get('text_rotation'):
+                properties['rotation'] = spec['text_rotation']
+
+        for edge, side in zip(('left', 'right', 'top', 'bottom'), border):
+            properties[edge] = self.BORDER_STYLES[side]
+
+        return properties
@@ -1,6 +1,11 @@
+import logging
+import numpy as np
 import pandas as pd
 import os
 from config import Config
+from services.reference_data import reference_data
+
+logger = logging.getLogger(__name__)
 
 class WagonClassifier:
     def __init__(self):
@@ -11,10 +16,10 @@ class WagonClassifier:
     def _load_classification_data(self):
         """Load wagon classification mapping from CSV"""
         try:
-            if os.path.exists(self.csv_path):
-                df = pd.read_csv(self.csv_path)
-                # Create mapping dictionary: WAGON_TYPE -> CATEGORY
-                self.classification_map = dict(zip(df['WAGON_TYPE'], df['CATEGORY']))
+            # Shared, already compiled map - copied so custom additions stay local until saved
+            classification_map = reference_data.classification_map
+            if classification_map is not None:
+                self.classification_map = dict(classification_map)
             else:
                 # Fallback: create the mapping manually if file doesn't exist
                 self.classification_map = {
@@ -66,7 +71,7 @@ class WagonClassifier:
                 self._save_to_csv()
                 
         except Exception as e:
-            print(f"Error loading wagon classification data: {e}")
+            logger.error("Error loading wagon classification data: %s", e)
             self.classification_map = {}
     
     def classify_wagon(self, wagon_type):
@@ -80,6 +85,14 @@ class WagonClassifier:
         # Return classification if found, otherwise return the original wagon type
         return self.classification_map.get(wagon_type, wagon_type)
     
+    def classify_series(self, wagon_types):
+        """Classify a whole Series of wagon types, looking up each distinct type once"""
+        # NaN gets code -1, which picks the trailing '' below
+        codes, uniques = pd.factorize(wagon_types)
+        classified = np.array([self.classify_wagon(wagon_type) for wagon_type in uniques] + [''], dtype=object)
+        
+        return pd.Series(classified[codes], index=wagon_types.index, name=wagon_types.name)
+    
     def add_custom_classifications(self, custom_classifications_dict):
         """Add multiple custom classifications and save to CSV"""
         if not custom_classifications_dict:
@@ -91,7 +104,7 @@ class WagonClassifier:
         # Save to CSV file
         self._save_to_csv()
         
-        print(f"Added {len(custom_classifications_dict)} custom classifications to CSV")
+        logger.info("Added %d custom classifications to CSV", len(custom_classifications_dict))
     
     def _save_to_csv(self):
         """Save current classification map to CSV file"""
@@ -108,9 +121,10 @@ class WagonClassifier:
             
             # Save to CSV
             df.to_csv(self.csv_path, index=False)
+            reference_data.invalidate('wagon_classifications')
             
         except Exception as e:
-            print(f"Error saving wagon classifications to CSV: {e}")
+            logger.error("Error saving wagon classifications to CSV: %s", e)
     
     def get_all_classifications(self):
         """Get all current classifications"""
@@ -0,0 +1,40 @@
+import os
+import shutil
+import sys
+import tempfile
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+# Config derives the upload, output and data folders from the working directory
+# when it is imported, so the tests run in a scratch copy of the data files and
+# sample uploads and never touch the repository's own folders
+WORKDIR = tempfile.mkdtemp(prefix='conv-tests-')
+shutil.copytree(os.path.join(REPO_ROOT, 'data'), os.path.join(WORKDIR, 'data'))
+os.makedirs(os.path.join(WORKDIR, 'uploads'))
+for name in ('MAFour.csv', 'MAFour5.csv'):
+    shutil.copy(os.path.join(REPO_ROOT, 'uploads', name), os.path.join(WORKDIR, 'uploads', name))
+os.chdir(WORKDIR)
+
+os.environ['STORAGE_SWEEP_INTERVAL'] = '0'
+os.environ['REPORT_CACHE_MAX_BYTES'] = '0'
+os.environ['PROCESSED_STORE_ENABLED'] = 'false'
+
+import pytest
+
+from config import Config
+
+Config.init_app()
+
+@pytest.fixture(autouse=True)
+def fresh_caches():
+    """Every test parses and aggregates from scratch"""
+    from services.parse_cache import parse_cache
+    from services.stage_cache import stage_cache
+    parse_cache.clear()
+    stage_cache.clear()
+    yield
+
+def pytest_sessionfinish(session, exitstatus):
+    os.chdir(REPO_ROOT)
+    shutil.rmtree(WORKDIR, ignore_errors=True)
@@ -0,0 +1,54 @@
+"""Streamed and incremental aggregation against a full in-memory recompute"""
+import shutil
+import pytest
+from config import Config
+from services.parse_cache import parse_cache
+from services.reference_data import reference_data
+from services.report_pipeline import ReportPipeline
+from services.stage_cache import stage_cache
+
+def assert_same_sections(actual, expected):
+    # Station order matters, the report lists stations in this order
+    assert list(actual) == list(expected)
+    for station, info in expected.items():
+        assert actual[station]['ic_sttn'] == info['ic_sttn'], station
+        assert actual[station]['details'] == info['details'], station
+        assert actual[station]['counts'] == info['counts'], station
+
+@pytest.mark.parametrize('filename', ['MAFour.csv', 'MAFour5.csv'])
+@pytest.mark.parametrize('chunk_rows', [13, 100000])
+def test_streamed_aggregates_equal_in_memory(monkeypatch, filename, chunk_rows):
+    monkeypatch.setattr(Config, 'STREAMING_CHUNK_ROWS', chunk_rows)
+
+    _, handedover_data, takenover_data = ReportPipeline(streaming=False).aggregate(filename)
+    report_df, streamed_handedover, streamed_takenover = ReportPipeline(streaming=True).aggregate(filename)
+
+    assert report_df is None
+    assert_same_sections(streamed_handedover, handedover_data)
+    assert_same_sections(streamed_takenover, takenover_data)
+
+@pytest.fixture
+def restore_classifications(tmp_path):
+    """Put the wagon classifications back after a test edits them"""
+    backup = tmp_path / 'wagon_classifications.csv'
+    shutil.copy(Config.WAGON_CLASSIFICATIONS_FILE, backup)
+    yield
+    shutil.copy(backup, Config.WAGON_CLASSIFICATIONS_FILE)
+    reference_data.invalidate('wagon_classifications')
+
+def test_incremental_reclassify_equals_full_recompute(restore_classifications):
+    ReportPipeline().build_report_data('MAFour.csv')
+
+    # Move existing wagon types between categories and add an unused one
+    ReportPipeline().add_custom_classifications({'NMG': 'BOX', 'BCNHL': 'SHRA', 'ZZZ': 'JUMBO'})
+    hits = stage_cache.hits
+    incremental = ReportPipeline().build_report_data('MAFour.csv')
+    # Reclassified from the cached stages, not parsed again
+    assert stage_cache.hits == hits + 1
+
+    stage_cache.clear()
+    parse_cache.clear()
+    full = ReportPipeline().build_report_data('MAFour.csv')
+
+    assert_same_sections(incremental.handedover_data, full.handedover_data)
+    assert_same_sections(incremental.takenover_data, full.takenover_data)
@@ -0,0 +1,29 @@
+"""Status codes of /api/aggregates for bad requests and server errors"""
+import os
+import pytest
+from config import Config
+from services.report_pipeline import ReportPipeline
+
+@pytest.fixture
+def client():
+    from app import create_app
+    return create_app().test_client()
+
+def test_unknown_field_is_bad_request(client):
+    response = client.get('/api/aggregates/MAFour.csv?fields=totals,nonsense')
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'Unknown field: nonsense'
+
+def test_missing_columns_are_bad_request(client):
+    with open(os.path.join(Config.UPLOAD_FOLDER, 'wrong_export.csv'), 'w') as f:
+        f.write('title\nsummary\nZONE TO,IC STTN\nWR,BL\n')
+    response = client.get('/api/aggregates/wrong_export.csv')
+    assert response.status_code == 400
+    assert response.get_json()['error'].startswith('Missing columns:')
+
+def test_internal_value_error_is_server_error(client, monkeypatch):
+    def fail(self, filename):
+        raise ValueError('cannot reindex on an axis with duplicate labels')
+    monkeypatch.setattr(ReportPipeline, 'report_summary', fail)
+    response = client.get('/api/aggregates/MAFour.csv')
+    assert response.status_code == 500
@@ -0,0 +1,115 @@
+"""Final report of uploads/MAFour.csv against the output of the original implementation
+
+tests/golden/MAFour_final_report.json holds the values, styles, merges and
+dimensions of the report the code before the in-memory pipeline generated.
+After an intended change to the report, regenerate it from a known good report:
+
+    python tests/test_final_report.py reports/MAFour_final_report.xlsx
+"""
+import json
+import os
+import re
+import sys
+import pytest
+from openpyxl import load_workbook
+
+GOLDEN_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'golden', 'MAFour_final_report.json')
+
+# The title carries the report date, so it is checked by pattern
+TITLE_CELL = 'A1'
+TITLE_PATTERN = re.compile(r'ZONAL INTERCHANGE ON \d{2}-\d{2}-\d{4}')
+
+def snapshot(path):
+    """Values and styles of every written or styled cell, merged ranges and dimensions"""
+    ws = load_workbook(path).active
+    styles = []
+    style_index = {}
+    cells = {}
+    for row in ws.iter_rows():
+        for cell in row:
+            if cell.value is None and not cell.has_style:
+                continue
+            style = (
+                cell.font.b, cell.font.sz, cell.font.name,
+                cell.border.left.style, cell.border.right.style, cell.border.top.style, cell.border.bottom.style,
+                cell.alignment.horizontal, cell.alignment.vertical, cell.alignment.text_rotation,
+                cell.alignment.wrap_text, cell.fill.fgColor.rgb
+            )
+            if style not in style_index:
+                style_index[style] = len(styles)
+                styles.append(list(style))
+            value = None if cell.coordinate == TITLE_CELL else cell.value
+            cells[cell.coordinate] = [value, style_index[style]]
+
+    return {
+        'title': ws[TITLE_CELL].value,
+        # Style indexes depend on cell order, so cells are compared with their styles resolved
+        'cells': {coordinate: [value, styles[style]] for coordinate, (value, style) in cells.items()},
+        'merged': sorted(str(cell_range) for cell_range in ws.merged_cells.ranges),
+        'widths': {key: dimension.width for key, dimension in ws.column_dimensions.items()},
+        'heights': {str(key): dimension.height for key, dimension in ws.row_dimensions.items() if dimension.height}
+    }
+
+def write_golden(path):
+    report = snapshot(path)
+    report.pop('title')
+    styles = []
+    cells = {}
+    for coordinate, (value, style) in report['cells'].items():
+        if style not in styles:
+            styles.append(style)
+        cells[coordinate] = [value, styles.index(style)]
+    with open(GOLDEN_FILE, 'w', encoding='utf-8') as f:
+        json.dump(dict(report, styles=styles, cells=cells), f, sort_keys=True, separators=(',', ':'))
+
+def load_golden():
+    with open(GOLDEN_FILE, encoding='utf-8') as f:
+        golden = json.load(f)
+    styles = golden.pop('styles')
+    golden['cells'] = {coordinate: [value, styles[style]] for coordinate, (value, style) in golden['cells'].items()}
+    return golden
+
+def generate(renderer):
+    from services.final_report_generator import FinalReportGenerator
+    from services.report_pipeline import ReportPipeline
+
+    pipeline = ReportPipeline(write_intermediate=False, streaming=False)
+    _, handedover_data, takenover_data = pipeline.aggregate('MAFour.csv')
+    report_path, message = FinalReportGenerator(renderer).generate_final_report(
+        handedover_data, takenover_data, 'MAFour.csv'
+    )
+    assert report_path, message
+    return report_path
+
+def test_report_matches_golden_output():
+    report = snapshot(generate('openpyxl'))
+    golden = load_golden()
+
+    assert TITLE_PATTERN.fullmatch(report.pop('title'))
+    assert report['merged'] == golden['merged']
+    assert report['widths'] == golden['widths']
+    assert report['heights'] == golden['heights']
+
+    # Cell by cell, so a failure names the first differing cells
+    differing = sorted(
+        coordinate for coordinate in report['cells'].keys() | golden['cells'].keys()
+        if report['cells'].get(coordinate) != golden['cells'].get(coordinate)
+    )
+    assert not differing, f"{len(differing)} cells differ from the golden report: {differing[:20]}"
+
+@pytest.mark.parametrize('merge_list', [True, False])
+def test_streaming_renderer_matches_golden_values_and_merges(monkeypatch, merge_list):
+    from services.streaming_report_renderer import StreamingReportRenderer
+
+    # Without xlsxwriter's merge list the renderer falls back to merge_range() in memory
+    monkeypatch.setattr(StreamingReportRenderer, 'has_merge_list', staticmethod(lambda ws: merge_list))
+    report = snapshot(generate('xlsxwriter'))
+    golden = load_golden()
+
+    assert report['merged'] == golden['merged']
+    values = {coordinate: value for coordinate, (value, _) in report['cells'].items() if value is not None}
+    golden_values = {coordinate: value for coordinate, (value, _) in golden['cells'].items() if value is not None}
+    assert values == golden_values
+
+if __name__ == '__main__':
+    write_golden(sys.argv[1])
@@ -0,0 +1,62 @@
+"""Job state shared through the state folder and cancellation of running jobs"""
+import threading
+import time
+from services.job_queue import JobQueue, CANCELLED, SUCCEEDED
+
+def wait_finished(queue, job_id, timeout=10):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = queue.get(job_id)
+        if job is not None and job.finished:
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"job {job_id} did not finish")
+
+def test_other_process_sees_state_and_result(tmp_path):
+    owner = JobQueue(workers=1, state_folder=str(tmp_path), heartbeat_seconds=1)
+    other = JobQueue(workers=1, state_folder=str(tmp_path), heartbeat_seconds=1)
+
+    job = owner.submit(lambda name: (f"/reports/{name}.xlsx", 'done'), 'upload.csv')
+    wait_finished(owner, job.id)
+
+    seen = other.get(job.id)
+    assert seen.state == SUCCEEDED
+    assert seen.result == '/reports/upload.csv.xlsx'
+    assert other.get('0' * 32) is None
+
+def test_running_job_stops_when_cancelled(tmp_path):
+    queue = JobQueue(workers=1, state_folder=str(tmp_path), heartbeat_seconds=1)
+    started = threading.Event()
+
+    def work():
+        started.set()
+        while not queue.cancel_requested():
+            time.sleep(0.01)
+        return None, 'Cancelled'
+
+    job = queue.submit(work, max_retries=0)
+    started.wait(5)
+    queue.cancel(job.id)
+    assert wait_finished(queue, job.id).state == CANCELLED
+
+def test_late_result_of_cancelled_job_is_discarded(tmp_path):
+    owner = JobQueue(workers=1, state_folder=str(tmp_path), heartbeat_seconds=1)
+    other = JobQueue(workers=1, state_folder=str(tmp_path), heartbeat_seconds=1)
+    started = threading.Event()
+    release = threading.Event()
+    discarded = []
+
+    def work():
+        started.set()
+        release.wait(5)
+        return 'report.xlsx', 'done'
+
+    job = owner.submit(work, max_retries=0, discard=discarded.append)
+    started.wait(5)
+    # Cancelled through another process's queue, the owner sees the marker file
+    other.cancel(job.id)
+    release.set()
+
+    assert wait_finished(owner, job.id).state == CANCELLED
+    assert discarded == ['report.xlsx']
+    assert other.get(job.id).state == CANCELLED
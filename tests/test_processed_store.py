@@ -0,0 +1,67 @@
+"""Retention of the processed day store"""
+import os
+import time
+from datetime import date
+import pandas as pd
+from services.processed_store import ProcessedDayStore
+
+def put_day(store, day):
+    period = {'zone': 'WR', 'date_from': date(2024, 1, day), 'date_to': date(2024, 1, day)}
+    return store.put(period, pd.DataFrame({'Wagons': range(1000)}), {'day': day})
+
+def age(entry_dir, seconds):
+    past = time.time() - seconds
+    os.utime(entry_dir, (past, past))
+
+def test_least_recently_used_days_removed_over_max_bytes(tmp_path):
+    store = ProcessedDayStore(str(tmp_path), max_bytes=1)
+    first = put_day(store, 1)
+    age(first, 60)
+    second = put_day(store, 2)
+
+    # The day just written stays even when it alone is over the limit
+    assert not os.path.exists(first)
+    assert [entry_dir for _, _, entry_dir in store.entries()] == [second]
+
+def test_read_refreshes_last_access(tmp_path):
+    store = ProcessedDayStore(str(tmp_path))
+    first = put_day(store, 1)
+    second = put_day(store, 2)
+    age(first, 120)
+    age(second, 60)
+
+    assert store.get_aggregates('WR', date(2024, 1, 1)) == {'day': 1}
+    # Room for the two stored days and half of another, so the next put removes one
+    sizes = [size for _, size, _ in store.entries()]
+    store.max_bytes = sum(sizes) + max(sizes) // 2
+    third = put_day(store, 3)
+
+    # The second day is now the least recently used one
+    assert os.path.exists(first) and os.path.exists(third)
+    assert not os.path.exists(second)
+
+def test_expired_days_removed(tmp_path):
+    store = ProcessedDayStore(str(tmp_path), ttl_seconds=3600)
+    first = put_day(store, 1)
+    age(first, 7200)
+    second = put_day(store, 2)
+
+    assert not os.path.exists(first)
+    assert os.path.exists(second)
+
+def test_storage_sweep_removes_whole_days(tmp_path):
+    from services.storage_manager import ProcessedDayArea, StorageManager
+
+    store = ProcessedDayStore(str(tmp_path))
+    first = put_day(store, 1)
+    age(first, 7200)
+    second = put_day(store, 2)
+
+    manager = StorageManager(interval=0, min_age_seconds=0)
+    manager.areas = [ProcessedDayArea('processed_days', store, 0, 3600, manager._recently_used)]
+    manager.evicted = {'processed_days': {'files': 0, 'bytes': 0}}
+    usage = manager.sweep()['areas']['processed_days']
+
+    assert not os.path.exists(first) and os.path.exists(second)
+    assert usage['files'] == 1 and usage['evicted']['files'] == 1
+    assert manager.areas[0].scan()[0].name == 'WR/2024-01-02'